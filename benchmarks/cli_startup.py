@@ -0,0 +1,88 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+"""
+Benchmark of spellbook CLI startup time, the cost Merlin pays on every step.
+
+Each command is run --repeat times; the best wall time is reported along
+with the slowest imports from `python -X importtime`. With --max-ms the
+script exits 1 if any command is slower, to guard against regressions.
+
+Usage: python benchmarks/cli_startup.py --repeat 10 --max-ms 500
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+COMMANDS = {
+    "help": ["--help"],
+    "serialize": ["serialize", "--output", "{tmp}/thing.json", "--vars", "a/b=1", "c=spam"],
+    "stack-npz help": ["stack-npz", "--help"],
+    "learn help": ["learn", "--help"],
+}
+
+
+def run(args, importtime=False):
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-m", "spellbook"] + args
+    start = time.perf_counter()
+    process = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - start
+    if process.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} failed:\n{process.stderr}")
+    return elapsed, process.stderr
+
+
+def slowest_imports(importtime_output, n=5):
+    """Top n (cumulative us, module) pairs from -X importtime output"""
+    imports = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:n]
+
+
+def setup_argparse():
+    parser = argparse.ArgumentParser(description="spellbook CLI startup benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per command, the best is reported")
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if any command takes longer")
+    parser.add_argument("--imports", type=int, default=5, help="number of slowest imports to list")
+    return parser
+
+
+def main():
+    args = setup_argparse().parse_args()
+    slow = []
+    # keep the bytecode cache on, it is part of what is being measured
+    os.environ.pop("PYTHONDONTWRITEBYTECODE", None)
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, command in COMMANDS.items():
+            command = [c.format(tmp=tmp) for c in command]
+            run(command)  # warm the bytecode and filesystem caches
+            best = min(run(command)[0] for _ in range(args.repeat)) * 1000
+            print(f"{name:<16} {best:8.1f} ms")
+            _, importtime = run(command, importtime=True)
+            for cumulative, module in slowest_imports(importtime, args.imports):
+                print(f"    {cumulative / 1000:8.1f} ms  {module}")
+            if args.max_ms is not None and best > args.max_ms:
+                slow.append(name)
+    if slow:
+        print(f"Slower than {args.max_ms} ms: {', '.join(slow)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+"""
+Benchmark of spellbook collect over a synthetic tree of per-sample result files,
+for each reader thread count and JSON backend, and of finding the files with
+collect -glob against glob.glob.
+
+Usage: python benchmarks/collect_files.py --files 1000 10000 100000 --workers 1 8 32
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+
+from spellbook.data_formatting import collector
+
+
+def make_tree(directory, n_files, fields=20, per_dir=100):
+    """n_files result files in directories of per_dir, like a Merlin workspace"""
+    paths = []
+    for i in range(n_files):
+        subdir = os.path.join(directory, f"{i // per_dir:05d}")
+        if i % per_dir == 0:
+            os.makedirs(subdir)
+        path = os.path.join(subdir, f"sample_{i}.json")
+        doc = {"inputs": {f"x{j}": i * 0.1 + j for j in range(fields)}, "outputs": {"y": [i * 0.5] * fields}}
+        with open(path, "w") as f:
+            json.dump(doc, f)
+        paths.append(path)
+    return paths
+
+
+def setup_argparse():
+    parser = argparse.ArgumentParser(description="collect benchmark")
+    parser.add_argument("--files", type=int, nargs="+", default=[1000, 10000], help="numbers of files to collect")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32], help="reader thread counts")
+    parser.add_argument("--dir", default=None, help="directory for the tree, eg on a parallel filesystem")
+    return parser
+
+
+def main():
+    args = setup_argparse().parse_args()
+    backends = ["json"] + [b for b in ("orjson", "ujson") if getattr(collector, b) is not None]
+    print(f"{'files':>8} {'workers':>8} {'backend':>8} {'seconds':>8} {'files/s':>10}")
+    for n_files in args.files:
+        with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+            paths = make_tree(directory, n_files)
+            pattern = os.path.join(directory, "*", "*.json")
+            start = time.perf_counter()
+            n_glob = len(glob.glob(pattern))
+            glob_seconds = time.perf_counter() - start
+            for workers in args.workers:
+                start = time.perf_counter()
+                assert len(collector.expand_glob(pattern, workers)) == n_glob
+                print(f"{n_files:>8} {workers:>8} {'-glob':>8} {time.perf_counter() - start:>8.3f}   (glob.glob {glob_seconds:.3f})")
+            outfile = os.path.join(directory, "results.json")
+            for workers in args.workers:
+                for backend in backends:
+                    start = time.perf_counter()
+                    collector.collect(paths, outfile, workers=workers, backend=backend)
+                    seconds = time.perf_counter() - start
+                    print(f"{n_files:>8} {workers:>8} {backend:>8} {seconds:>8.3f} {n_files / seconds:>10.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
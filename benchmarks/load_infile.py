@@ -0,0 +1,62 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+"""
+Benchmark of load_infile on an uncompressed .npz, memory-mapped and fully read,
+for the default X/y keys and for a multi-key X selection.
+
+Usage: python benchmarks/load_infile.py --rows 2000000 --keys 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from spellbook.utils import load_infile
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        X, y = func()
+        X.sum(), y.sum()  # touch every byte so mapped pages are counted
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def setup_argparse():
+    parser = argparse.ArgumentParser(description="load_infile benchmark")
+    parser.add_argument("--rows", type=int, default=1000000, help="rows per array")
+    parser.add_argument("--keys", type=int, default=4, help="arrays stacked into X for the multi-key case")
+    parser.add_argument("--repeat", type=int, default=3, help="loads per case, the best is reported")
+    return parser
+
+
+def main():
+    args = setup_argparse().parse_args()
+    rng = np.random.default_rng(0)
+    arrays = {f"x{i}": rng.random((args.rows, 2)) for i in range(args.keys)}
+    arrays["X"] = rng.random((args.rows, 2 * args.keys))
+    arrays["y"] = rng.random((args.rows, 1))
+    x_keys = ",".join(f"x{i}" for i in range(args.keys))
+    with tempfile.TemporaryDirectory() as directory:
+        fname = os.path.join(directory, "data.npz")
+        np.savez(fname, **arrays)
+        print(f"{'selection':<10} {'mmap':>8} {'read':>8}   ({os.path.getsize(fname) / 1e6:.0f} MB file)")
+        for label, keys in (("X,y", None), ("x0..,y", x_keys)):
+            mapped = best_time(lambda: load_infile(fname, X_keys=keys), args.repeat)
+            read = best_time(lambda: load_infile(fname, X_keys=keys, mmap_mode=None), args.repeat)
+            print(f"{label:<10} {mapped:>8.3f} {read:>8.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
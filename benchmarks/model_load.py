@@ -0,0 +1,70 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+"""
+Benchmark of regressor load time for the pickle and .joblib model formats.
+
+Usage: python benchmarks/model_load.py --samples 20000 --estimators 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.gaussian_process import GaussianProcessRegressor
+
+from spellbook.ml.model_io import load_regressor, save_regressor
+
+
+def fit_models(n_samples, n_estimators):
+    rng = np.random.default_rng(0)
+    X = rng.random((n_samples, 5))
+    y = np.sin(X).sum(axis=1)
+    forest = RandomForestRegressor(n_estimators=n_estimators, n_jobs=-1, random_state=0).fit(X, y)
+    # a GP keeps its training data as plain arrays, which joblib can memory-map
+    n_gp = min(n_samples, 2000)
+    gp = GaussianProcessRegressor(optimizer=None).fit(X[:n_gp], y[:n_gp])
+    return {"random forest": forest, "gaussian process": gp}
+
+
+def best_load_time(fname, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load_regressor(fname)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def setup_argparse():
+    parser = argparse.ArgumentParser(description="model format load-time benchmark")
+    parser.add_argument("--samples", type=int, default=20000, help="training samples")
+    parser.add_argument("--estimators", type=int, default=100, help="trees in the forest")
+    parser.add_argument("--repeat", type=int, default=3, help="loads per format, the best is reported")
+    return parser
+
+
+def main():
+    args = setup_argparse().parse_args()
+    models = fit_models(args.samples, args.estimators)
+    print(f"{'model':<18} {'format':<8} {'MB':>8} {'load s':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, regr in models.items():
+            for ext in (".pkl", ".joblib"):
+                fname = os.path.join(directory, "model" + ext)
+                save_regressor(regr, fname)
+                size = os.path.getsize(fname) / 1e6
+                elapsed = best_load_time(fname, args.repeat)
+                print(f"{name:<18} {ext:<8} {size:>8.1f} {elapsed:>8.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+"""
+Benchmark of write time, read time and file size for each npz codec.
+
+Usage: python benchmarks/npz_codecs.py --rows 100000 --cols 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from spellbook.data_formatting import npz_io
+
+
+# (codec, level) pairs to compare; codecs whose package is missing are skipped
+CANDIDATES = [
+    ("none", None),
+    ("zlib", 1),
+    ("zlib", 6),
+    ("zstd", 1),
+    ("zstd", 3),
+    ("lz4", 0),
+]
+
+
+def make_arrays(n_rows, n_cols):
+    rng = np.random.default_rng(0)
+    # smooth-ish float64 data, like simulation outputs, compresses a little
+    X = np.cumsum(rng.normal(size=(n_rows, n_cols)), axis=0)
+    y = rng.random((n_rows, 1))
+    return {"X": X, "y": y}
+
+
+def time_codec(fname, arrays, codec, level):
+    start = time.perf_counter()
+    npz_io.save_npz(fname, arrays, codec=codec, level=level)
+    write = time.perf_counter() - start
+    start = time.perf_counter()
+    with npz_io.load_npz(fname) as data:
+        for k in data.files:
+            _ = data[k]
+    read = time.perf_counter() - start
+    return write, read, os.path.getsize(fname)
+
+
+def setup_argparse():
+    parser = argparse.ArgumentParser(description="npz codec benchmark")
+    parser.add_argument("--rows", type=int, default=100000, help="rows of X")
+    parser.add_argument("--cols", type=int, default=50, help="columns of X")
+    return parser
+
+
+def main():
+    args = setup_argparse().parse_args()
+    arrays = make_arrays(args.rows, args.cols)
+    raw = sum(a.nbytes for a in arrays.values())
+    print(f"{raw / 1e6:.1f} MB of float64")
+    print(f"{'codec':>6} {'level':>6} {'write s':>8} {'read s':>8} {'ratio':>6}")
+    with tempfile.TemporaryDirectory() as directory:
+        for codec, level in CANDIDATES:
+            try:
+                npz_io.check_codec(codec)
+            except ValueError as e:
+                print(f"{codec:>6} skipped: {e}")
+                continue
+            fname = os.path.join(directory, f"{codec}_{level}.npz")
+            write, read, size = time_codec(fname, arrays, codec, level)
+            print(f"{codec:>6} {str(level):>6} {write:>8.3f} {read:>8.3f} {raw / size:>6.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
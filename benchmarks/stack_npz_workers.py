@@ -0,0 +1,71 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+"""
+Benchmark for how stack-npz scales with the number of loader threads.
+
+Usage: python benchmarks/stack_npz_workers.py --files 200 --workers 1 2 4 8
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from spellbook.data_formatting.stack_npz import Stacker
+
+
+def make_sources(directory, n_files, n_rows, n_cols):
+    sources = []
+    rng = np.random.default_rng(0)
+    for i in range(n_files):
+        fname = os.path.join(directory, f"source_{i:05}.npz")
+        np.savez_compressed(fname, X=rng.random((n_rows, n_cols)), y=rng.random(n_rows))
+        sources.append(fname)
+    return sources
+
+
+def time_stack(target, sources, workers, stream):
+    stacker = Stacker(workers=workers)
+    start = time.perf_counter()
+    # stack-npz prints a line per source
+    with contextlib.redirect_stdout(io.StringIO()):
+        stacker.run(target, sources, force=True, stream=stream)
+    return time.perf_counter() - start
+
+
+def setup_argparse():
+    parser = argparse.ArgumentParser(description="stack-npz --workers benchmark")
+    parser.add_argument("--files", type=int, default=200, help="number of source files")
+    parser.add_argument("--rows", type=int, default=100, help="rows per source array")
+    parser.add_argument("--cols", type=int, default=1000, help="columns per source array")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="thread counts to time")
+    parser.add_argument("--stream", action="store_true", help="time the streaming stacker")
+    return parser
+
+
+def main():
+    args = setup_argparse().parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        sources = make_sources(directory, args.files, args.rows, args.cols)
+        target = os.path.join(directory, "stacked.npz")
+        print(f"{args.files} files of {args.rows}x{args.cols} float64, {os.cpu_count()} cpus")
+        print(f"{'workers':>8} {'seconds':>9} {'speedup':>8}")
+        baseline = None
+        for workers in args.workers:
+            elapsed = time_stack(target, sources, workers, args.stream)
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {elapsed:>9.3f} {baseline / elapsed:>8.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
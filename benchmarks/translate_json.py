@@ -0,0 +1,95 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+"""
+Benchmark of spellbook translate: parsing the results json, against turning the
+parsed samples into arrays with compiled columns and with the old per-sample
+path walk, and the whole streaming translate with its peak memory.
+
+Usage: python benchmarks/translate_json.py --samples 1000000 --inputs 10 --outputs 10
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+
+from spellbook.data_formatting import translator
+
+
+def make_samples(n_samples, n_inputs, n_outputs):
+    rng = np.random.default_rng(0)
+    values = rng.random((n_samples, n_inputs + n_outputs)).tolist()
+    return [
+        {
+            "inputs": {f"x{j}": row[j] for j in range(n_inputs)},
+            "outputs": {"scalars": {f"y{j}": row[n_inputs + j] for j in range(n_outputs)}},
+        }
+        for row in values
+    ]
+
+
+def old_translate(samples, section, schema):
+    arrays = {}
+    for s in samples:
+        translator.make_data_array_dict(arrays, s[section], schema)
+    return {path: np.array(values) for path, values in arrays.items()}
+
+
+def setup_argparse():
+    parser = argparse.ArgumentParser(description="json translate benchmark")
+    parser.add_argument("--samples", type=int, default=100000, help="number of samples")
+    parser.add_argument("--inputs", type=int, default=10, help="scalar inputs per sample")
+    parser.add_argument("--outputs", type=int, default=10, help="scalar outputs per sample")
+    parser.add_argument("--batch_size", type=int, default=10000, help="translate -batch_size")
+    parser.add_argument("--stream", action="store_true", help="also time the whole streaming translate")
+    return parser
+
+
+def main():
+    args = setup_argparse().parse_args()
+    samples = make_samples(args.samples, args.inputs, args.outputs)
+    schema = samples[0]
+    with tempfile.TemporaryDirectory() as directory:
+        fname = os.path.join(directory, "results.json")
+        with open(fname, "w") as f:
+            json.dump(samples, f)
+        start = time.perf_counter()
+        with open(fname, "r") as f:
+            json.load(f)
+        print(f"json.load of {os.path.getsize(fname) / 1e6:.0f} MB: {time.perf_counter() - start:.2f} s")
+
+        if args.stream:
+            translate_args = SimpleNamespace(
+                input=fname, output=os.path.join(directory, "results.npz"), schema="auto", batch_size=args.batch_size
+            )
+            start = time.perf_counter()
+            translator.process_args(translate_args)
+            seconds = time.perf_counter() - start
+            # a second, traced run for the memory it allocates
+            tracemalloc.start()
+            translator.process_args(translate_args)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"streaming translate: {seconds:.2f} s, peak allocated {peak / 1e6:.0f} MB")
+
+    for label, func in (("per-sample walk", old_translate), ("compiled columns", translator.translate)):
+        start = time.perf_counter()
+        for section in ("inputs", "outputs"):
+            func(samples, section, schema[section])
+        seconds = time.perf_counter() - start
+        print(f"{label:<17} {seconds:6.2f} s  {args.samples / seconds:10.0f} samples/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,7 +13,7 @@ from setuptools import find_packages, setup
 
 version = __import__("spellbook").__version__
 
-extras = ["dev"]
+extras = ["dev", "codecs"]
 
 
 def readme():
@@ -18,12 +18,60 @@ import click
     type=str,
     help="whitespace separated list of files to collect",
 )
+@click.option(
+    "-filelist",
+    required=False,
+    default=None,
+    type=str,
+    help="file listing the files to collect, one per line; - reads the list from stdin",
+)
+@click.option(
+    "-glob",
+    "globs",
+    required=False,
+    multiple=True,
+    type=str,
+    help="pattern of files to collect, eg 'workspace/*/*/results.json'; ** matches any number of directories. "
+    "Quote it so the shell does not expand it. Can be repeated",
+)
 @click.option("-outfile", required=False, default="results.hdf5", type=str, help="output file")
-def cli(instring, outfile):
+@click.option(
+    "-jsonl",
+    is_flag=True,
+    default=False,
+    help="write JSON Lines, one document per line, instead of one JSON array",
+)
+@click.option(
+    "-workers",
+    required=False,
+    default=1,
+    type=click.IntRange(min=1),
+    help="number of threads reading and parsing files ahead of the writer, and listing directories for -glob. "
+    "Output order does not depend on it",
+)
+@click.option(
+    "-backend",
+    required=False,
+    default="auto",
+    type=click.Choice(["auto", "json", "orjson", "ujson"]),
+    help="JSON parser. auto uses orjson or ujson when installed, else the standard library",
+)
+def cli(instring, filelist, globs, outfile, jsonl, workers, backend):
     """
-    Collect many json files into a single json file
+    Collect many json files into a single json file. Inputs come from -instring,
+    then -filelist, then each -glob, in that order
     """
     from spellbook.data_formatting import collector
 
-    args = SimpleNamespace(**{"instring": instring, "outfile": outfile})
+    args = SimpleNamespace(
+        **{
+            "instring": instring,
+            "filelist": filelist,
+            "globs": globs,
+            "outfile": outfile,
+            "jsonl": jsonl,
+            "workers": workers,
+            "backend": backend,
+        }
+    )
     collector.process_args(args)
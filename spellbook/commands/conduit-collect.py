@@ -9,7 +9,7 @@ from types import SimpleNamespace
 
 import click
 
-from spellbook.utils import OptionEatAll
+from spellbook.commands import OptionEatAll
 
 
 @click.command()
@@ -41,7 +41,14 @@ from spellbook.utils import OptionEatAll
     is_flag=True,
     help="auto insert a unique id for each file, creating a tree on the fly",
 )
-def cli(infiles, outfile, chunk_size, add_uuid):
+@click.option(
+    "-stream",
+    required=False,
+    default=False,
+    is_flag=True,
+    help="write each file's nodes to the output as soon as the file is read, so only one input file is held in memory",
+)
+def cli(infiles, outfile, chunk_size, add_uuid, stream):
     """
     Convert a list of conduit-readable files into a single big conduit node. Simple append, so nodes that already exist will get a name change to conflict-uuid
     """
@@ -53,6 +60,7 @@ def cli(infiles, outfile, chunk_size, add_uuid):
             "outfile": outfile,
             "chunk_size": chunk_size,
             "add_uuid": add_uuid,
+            "stream": stream,
         }
     )
     collector.process_args(args)
@@ -43,12 +43,34 @@ import click
     required=False,
     default=None,
     type=int,
-    help="Number of processes to translate chunks in parallel. Defaults to CPU count. Use with '-chunks' flag.",
+    help="Number of processes to translate chunks in parallel (defaults to CPU count), or without '-chunks' to split the "
+    "samples of the input between (defaults to 1, translating serially).",
 )
-def cli(input, output, schema, chunks, n):
+@click.option(
+    "-codec",
+    required=False,
+    default="none",
+    type=click.Choice(["none", "zlib", "zstd", "lz4"]),
+    help="Compression of .npz output. none and zlib are plain .npz files; zstd and lz4 are read back through spellbook",
+)
+@click.option(
+    "-level",
+    required=False,
+    default=None,
+    type=int,
+    help="Compression level for the codec. Defaults to the codec's default",
+)
+@click.option(
+    "-merge",
+    required=False,
+    default=False,
+    is_flag=True,
+    help="With '-chunks', also stack the translated chunks, in chunk-id order, into one .npz named by -output",
+)
+def cli(input, output, schema, chunks, n, codec, level, merge):
     """
     Flatten sample file into another format (conduit-compatible or numpy)", filtering with an external schema.
     """
     from spellbook.data_formatting.conduit.python import translator
 
-    translator.process_args(input, output, schema, chunks, n)
+    translator.process_args(input, output, schema, chunks, n, codec=codec, level=level, merge=merge)
@@ -37,20 +37,62 @@ import click
     required=False,
     default="random_forest_reg.pkl",
     type=str,
-    help="file to pickle the regressor to",
+    help="file to save the regressor to. A .joblib extension saves arrays uncompressed so predict can memory-map "
+    "them; anything else is pickled",
 )
 @click.option(
     "-regressor",
     required=False,
     default="RandomForestRegressor",
     type=str,
-    help="type of regressor",
+    help="type of regressor: any sklearn regressor name",
 )
-def cli(infile, x, y, outfile, regressor):
+@click.option(
+    "-reg_args",
+    required=False,
+    default=None,
+    type=str,
+    help="arguments for the regressor, as comma-separated key=value pairs (eg 'n_estimators=500,max_depth=None') "
+    "or a JSON object. RandomForestRegressor defaults to max_depth=2, n_estimators=100, random_state=0",
+)
+@click.option(
+    "-n_jobs",
+    required=False,
+    default=None,
+    type=int,
+    help="number of parallel jobs for regressors that support it, eg forests. -1 uses every core",
+)
+@click.option(
+    "-rows",
+    required=False,
+    default=None,
+    type=str,
+    help="range of samples to train on, as start:stop[:step] like a python slice, eg 0:10000",
+)
+@click.option(
+    "-subsample",
+    required=False,
+    default=None,
+    type=click.FloatRange(min=0, min_open=True),
+    help="train on a random subsample of the samples (of -rows, if given): a number of samples, or a fraction if below 1",
+)
+def cli(infile, x, y, outfile, regressor, reg_args, n_jobs, rows, subsample):
     """
     Use sklearn to make a regressor
     """
-    from spellbook.ml import learn_alt as learn
+    from spellbook.ml import learn
 
-    args = SimpleNamespace(**{"infile": infile, "X": x, "y": y, "outfile": outfile, "regressor": regressor})
-    learn.random_forest(args)
+    args = SimpleNamespace(
+        **{
+            "infile": infile,
+            "X": x,
+            "y": y,
+            "outfile": outfile,
+            "regressor": regressor,
+            "reg_args": reg_args,
+            "n_jobs": n_jobs,
+            "rows": rows,
+            "subsample": subsample,
+        }
+    )
+    learn.process_args(args)
@@ -60,7 +60,23 @@ import click
     type=str,
     help="constraint options to apply, of the form 'g1>1.0,g1<2,g2>4'. Comma-separated string with > or < separating data name and value",
 )
-def cli(infile, outfile, x_names, function, maximize, constraints):
+@click.option(
+    "--rows",
+    "-r",
+    required=False,
+    default=None,
+    type=str,
+    help="range of samples to use, as start:stop[:step] like a python slice, eg 0:10000",
+)
+@click.option(
+    "--subsample",
+    "-s",
+    required=False,
+    default=None,
+    type=click.FloatRange(min=0, min_open=True),
+    help="use a random subsample of the samples (of --rows, if given): a number of samples, or a fraction if below 1",
+)
+def cli(infile, outfile, x_names, function, maximize, constraints, rows, subsample):
     """
     Make a "barrier" cost func for constrained opt.
 
@@ -88,6 +104,8 @@ def cli(infile, outfile, x_names, function, maximize, constraints):
             "objective": function,
             "maximize_objective": maximize,
             "constraints": constraints,
+            "rows": rows,
+            "subsample": subsample,
         }
     )
     qoi.process_args(args)
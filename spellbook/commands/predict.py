@@ -15,7 +15,7 @@ import click
     "-infile",
     required=False,
     default="new_x.npy",
-    type=click.File("rb"),
+    type=str,
     help=".npy file with data to predict",
 )
 @click.option(
@@ -23,7 +23,7 @@ import click
     required=False,
     default="random_forest_reg.pkl",
     type=str,
-    help="pickled regressor file",
+    help="regressor file from learn, pickled or .joblib",
 )
 @click.option(
     "-outfile",
@@ -32,11 +32,53 @@ import click
     type=str,
     help="file to store the new predictions",
 )
-def cli(infile, reg, outfile):
+@click.option(
+    "-serve",
+    required=False,
+    default=False,
+    is_flag=True,
+    help="Run a prediction server that keeps regressors loaded (starting with -reg) and answers predict calls on -socket",
+)
+@click.option(
+    "-socket",
+    required=False,
+    default=None,
+    type=str,
+    help="Unix socket of the prediction server. If a server is listening there, predictions are handed to it. "
+    "Defaults to $SPELLBOOK_PREDICT_SOCKET or a per-user socket in the temp directory",
+)
+@click.option(
+    "-chunk_size",
+    required=False,
+    default=None,
+    type=click.IntRange(min=1),
+    help="Predict this many rows at a time, memory-mapping -infile and writing -outfile as a memory-mapped .npy. "
+    "Default (None): predict everything at once",
+)
+@click.option(
+    "-workers",
+    required=False,
+    default=1,
+    type=click.IntRange(min=1),
+    help="Number of threads predicting chunks in parallel. Use with -chunk_size",
+)
+def cli(infile, reg, outfile, serve, socket, chunk_size, workers):
     """
     Use a regressor to make a prediction
     """
     from spellbook.ml import predict
 
-    args = SimpleNamespace(**{"infile": infile, "reg": reg, "outfile": outfile})
-    predict.predict(args)
+    args = SimpleNamespace(
+        **{
+            "infile": infile,
+            "reg": reg,
+            "outfile": outfile,
+            "socket": socket,
+            "chunk_size": chunk_size,
+            "workers": workers,
+        }
+    )
+    if serve:
+        predict.serve(args)
+    else:
+        predict.predict(args)
@@ -9,7 +9,7 @@ from types import SimpleNamespace
 
 import click
 
-from spellbook.utils import OptionEatAll
+from spellbook.commands import OptionEatAll
 
 
 @click.command()
@@ -20,13 +20,69 @@ import click
     type=bool,
     help="Force write the target file",
 )
+@click.option(
+    "-s",
+    "--stream",
+    is_flag=True,
+    required=False,
+    default=False,
+    type=bool,
+    help="Stack one array at a time so memory scales with a single source file instead of the whole ensemble",
+)
+@click.option(
+    "-a",
+    "--append",
+    is_flag=True,
+    required=False,
+    default=False,
+    type=bool,
+    help="Grow an existing target with only the sources not yet merged into it, tracked in <target>.manifest.json. "
+    "Creates the target and manifest if the target does not exist. The rows already in the target are rewritten too; "
+    "only with '--codec none' are they copied without being decompressed and recompressed",
+)
+@click.option(
+    "-w",
+    "--workers",
+    required=False,
+    default=1,
+    type=click.IntRange(min=1),
+    help="Number of threads loading and decompressing source files. Output order does not depend on it",
+)
+@click.option(
+    "-c",
+    "--codec",
+    required=False,
+    default="zlib",
+    type=click.Choice(["none", "zlib", "zstd", "lz4"]),
+    help="Compression of the target file. none and zlib are plain .npz files; zstd and lz4 need their python package "
+    "and are read back through spellbook (eg learn), not np.load",
+)
+@click.option(
+    "-l",
+    "--level",
+    required=False,
+    default=None,
+    type=int,
+    help="Compression level for the codec (zlib 0-9, zstd 1-22, lz4 0-16). Defaults to the codec's default",
+)
 @click.argument("target", required=True, type=str)
 @click.argument("source", required=True, type=str, nargs=-1)
-def cli(force, target, source):
+def cli(force, stream, append, workers, codec, level, target, source):
     """
     stacker for npz files.
     """
     from spellbook.data_formatting import stack_npz
 
-    args = SimpleNamespace(**{"force": force, "target": target, "source": source})
+    args = SimpleNamespace(
+        **{
+            "force": force,
+            "stream": stream,
+            "append": append,
+            "workers": workers,
+            "codec": codec,
+            "level": level,
+            "target": target,
+            "source": source,
+        }
+    )
     stack_npz.process_args(args)
@@ -16,7 +16,7 @@ import click
     required=False,
     default="results.json",
     type=str,
-    help=".json file with data in it",
+    help=".json file with data in it: a JSON array of samples, or JSON Lines with one sample per line",
 )
 @click.option(
     "-output",
@@ -32,11 +32,18 @@ import click
     type=str,
     help="schema for a single sample that says what data to translate. Defaults to whole first node. Can be a comma-delimited list of subpaths, eg inputs,outputs/scalars,metadata",
 )
-def cli(input, output, schema):
+@click.option(
+    "-batch_size",
+    required=False,
+    default=10000,
+    type=click.IntRange(min=1),
+    help="number of samples parsed and converted at a time. The input file is read incrementally",
+)
+def cli(input, output, schema, batch_size):
     """
     Flatten sample json file into numpy", filtering with an external schema.
     """
     from spellbook.data_formatting import translator
 
-    args = SimpleNamespace(**{"input": input, "output": output, "schema": schema})
+    args = SimpleNamespace(**{"input": input, "output": output, "schema": schema, "batch_size": batch_size})
     translator.process_args(args)
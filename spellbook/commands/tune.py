@@ -0,0 +1,114 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+from types import SimpleNamespace
+
+import click
+
+
+@click.command()
+@click.option(
+    "-infile",
+    required=False,
+    default="results.npz",
+    type=str,
+    help=".npz file with X and y data",
+)
+@click.option(
+    "-X",
+    required=False,
+    default=None,
+    type=str,
+    help="variable(s) in infile for the input, defaults to X; can be a comma-delimited list",
+)
+@click.option(
+    "-y",
+    required=False,
+    default=None,
+    type=str,
+    help="variable(s) in infile for the output, defaults to y; can be a comma-delimited list",
+)
+@click.option(
+    "-regressors",
+    required=False,
+    default=None,
+    type=str,
+    help="comma-delimited sklearn regressor names to try with their default parameters. "
+    "Defaults to RandomForestRegressor when there is no -grid",
+)
+@click.option(
+    "-grid",
+    required=False,
+    default=None,
+    type=str,
+    help="JSON object, or a file holding one, of parameter values to try per regressor, eg "
+    '\'{"RandomForestRegressor": {"n_estimators": [50, 100], "max_depth": [2, null]}}\'',
+)
+@click.option(
+    "-n_iter",
+    required=False,
+    default=None,
+    type=click.IntRange(min=1),
+    help="try this many random grid points per regressor instead of the whole grid",
+)
+@click.option("-cv", required=False, default=5, type=click.IntRange(min=2), help="number of cross-validation folds")
+@click.option(
+    "-scoring",
+    required=False,
+    default=None,
+    type=str,
+    help="sklearn scoring name, eg neg_mean_squared_error. Defaults to the regressor's R^2",
+)
+@click.option(
+    "-halving",
+    is_flag=True,
+    default=False,
+    help="successive halving: score on a subsample first and only refine the best 1/factor of candidates",
+)
+@click.option("-factor", required=False, default=3, type=click.IntRange(min=2), help="halving reduction factor")
+@click.option(
+    "-processes",
+    required=False,
+    default=None,
+    type=click.IntRange(min=1),
+    help="number of worker processes, defaults to every core",
+)
+@click.option("-seed", required=False, default=0, type=int, help="random seed for -n_iter and halving subsamples")
+@click.option(
+    "-outfile",
+    required=False,
+    default="best_reg.pkl",
+    type=str,
+    help="file to save the best regressor, refit on all the data, to. A .joblib extension saves arrays "
+    "uncompressed so predict can memory-map them",
+)
+@click.option("-scores", required=False, default="scores.csv", type=str, help="csv file for the table of scores")
+def cli(infile, x, y, regressors, grid, n_iter, cv, scoring, halving, factor, processes, seed, outfile, scores):
+    """
+    Cross-validate sklearn regressors and parameters in parallel and save the best
+    """
+    from spellbook.ml import tune
+
+    args = SimpleNamespace(
+        **{
+            "infile": infile,
+            "X": x,
+            "y": y,
+            "regressors": regressors,
+            "grid": grid,
+            "n_iter": n_iter,
+            "cv": cv,
+            "scoring": scoring,
+            "halving": halving,
+            "factor": factor,
+            "processes": processes,
+            "seed": seed,
+            "outfile": outfile,
+            "scores": scores,
+        }
+    )
+    tune.process_args(args)
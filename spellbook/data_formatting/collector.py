@@ -5,14 +5,252 @@
 # contribute to Merlin-Spellbook.
 ##############################################################################
 
+import fnmatch
 import json
+import os
+import sys
+from functools import partial
 
+from spellbook.data_formatting.parallel import ordered_map
 
-def process_args(args):
-    result = []
-    for path in args.instring.split("\n"):
-        with open(path, "r") as json_file:
-            result.append(json.load(json_file))
 
-    with open(args.outfile, "w") as outfile:
-        json.dump(result, outfile)
+try:
+    import orjson
+except ModuleNotFoundError:
+    orjson = None
+
+try:
+    import ujson
+except ModuleNotFoundError:
+    ujson = None
+
+
+BACKENDS = ("auto", "json", "orjson", "ujson")
+
+
+def has_magic(name):
+    return any(c in name for c in "*?[")
+
+
+def list_dir(directory):
+    """(name, is_dir) of each entry in directory, using the types os.scandir already knows"""
+    try:
+        with os.scandir(directory or ".") as entries:
+            return [(entry.name, entry.is_dir()) for entry in entries]
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return []
+
+
+def walk_dirs(directories, workers=1):
+    """directories and every directory below them, listing each level in parallel"""
+    found = []
+    while directories:
+        found.extend(directories)
+        listings = ordered_map(list_dir, directories, workers)
+        directories = [
+            os.path.join(d, name)
+            for d, entries in zip(directories, listings)
+            for name, is_dir in entries
+            if is_dir and not name.startswith(".")
+        ]
+    return found
+
+
+def expand_glob(pattern, workers=1):
+    """
+    Sorted paths matching pattern, like glob.glob(pattern, recursive=True): "**"
+    matches any number of directories, and hidden names only match patterns
+    starting with ".". Each directory is read once with os.scandir, and the
+    directories at each level of the pattern are listed in parallel.
+    """
+    pattern = os.path.expanduser(pattern)
+    if not has_magic(pattern):
+        return [pattern] if os.path.lexists(pattern) else []
+    parts = pattern.split(os.sep)
+    paths = [os.sep if parts[0] == "" else ""]
+    if parts[0] == "":
+        parts = parts[1:]
+    for i, part in enumerate(parts):
+        last = i == len(parts) - 1
+        if part == "**":
+            paths = walk_dirs(paths, workers)
+            if last:
+                # like glob, a final ** also matches the files in those directories
+                listings = ordered_map(list_dir, paths, workers)
+                files = [os.path.join(d, n) for d, entries in zip(paths, listings) for n, is_dir in entries if not is_dir]
+                paths = [p for p in paths if p] + [f for f in files if not os.path.basename(f).startswith(".")]
+        elif has_magic(part):
+            listings = ordered_map(list_dir, paths, workers)
+            paths = [
+                os.path.join(d, name)
+                for d, entries in zip(paths, listings)
+                for name, is_dir in entries
+                if (is_dir or last) and fnmatch.fnmatch(name, part) and (part.startswith(".") or not name.startswith("."))
+            ]
+        elif part:
+            paths = [os.path.join(d, part) for d in paths]
+        if not paths:
+            return []
+    if not has_magic(parts[-1]):
+        paths = [p for p in paths if os.path.lexists(p)]
+    return sorted(paths)
+
+
+def read_file_list(fname):
+    """Paths listed one per line in fname, or in stdin for "-", read as they are needed"""
+    fp = sys.stdin if fname == "-" else open(fname, "r")
+    try:
+        for line in fp:
+            line = line.strip()
+            if line:
+                yield line
+    finally:
+        if fp is not sys.stdin:
+            fp.close()
+
+
+def input_paths(instring="", filelist=None, globs=(), workers=1):
+    """The paths to collect: the lines of instring, then those in filelist, then the matches of each glob"""
+    yield from (path for path in instring.split("\n") if path.strip())
+    if filelist is not None:
+        yield from read_file_list(filelist)
+    for pattern in globs:
+        yield from expand_glob(pattern, workers)
+
+
+def get_loads(backend="auto"):
+    """
+    The loads function of a JSON parser: orjson or ujson if installed (or asked for),
+    else the standard library. Documents the fast parsers reject, eg with NaN, fall
+    back to the standard library.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend {backend}! Choose one of {BACKENDS}")
+    if backend == "orjson" and orjson is None:
+        raise ValueError("The orjson backend needs the orjson package: pip install orjson")
+    if backend == "ujson" and ujson is None:
+        raise ValueError("The ujson backend needs the ujson package: pip install ujson")
+    if backend == "auto":
+        backend = "orjson" if orjson is not None else "ujson" if ujson is not None else "json"
+
+    if backend == "orjson":
+        fast_loads = orjson.loads
+    elif backend == "ujson":
+        fast_loads = ujson.loads
+    else:
+        return json.loads
+
+    def loads(data):
+        try:
+            return fast_loads(data)
+        except ValueError:
+            return json.loads(data)
+
+    return loads
+
+
+def read_json(path, loads=json.loads):
+    with open(path, "rb") as json_file:
+        return loads(json_file.read())
+
+
+def write_json_array(docs, outfile):
+    """Write docs one at a time as a JSON array, byte for byte what json.dump(list(docs)) writes"""
+    outfile.write("[")
+    for i, doc in enumerate(docs):
+        if i:
+            outfile.write(", ")
+        outfile.write(json.dumps(doc))
+    outfile.write("]")
+
+
+def write_json_lines(docs, outfile):
+    """Write docs one per line (JSON Lines)"""
+    for doc in docs:
+        outfile.write(json.dumps(doc))
+        outfile.write("\n")
+
+
+def iter_json_array(fp, chunk_size=2**20):
+    """
+    The elements of the top-level JSON array in text file fp, parsed one at a
+    time from chunk_size reads so the whole array is never in memory
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof, started = "", 0, False, False
+    while True:
+        # separators between elements; the decoder checks the elements themselves
+        while pos < len(buf) and (buf[pos].isspace() or (started and buf[pos] == ",")):
+            pos += 1
+        if pos < len(buf) and not started:
+            if buf[pos] != "[":
+                raise ValueError(f"{getattr(fp, 'name', 'input')} is not a JSON array")
+            started = True
+            pos += 1
+            continue
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        if pos < len(buf):
+            try:
+                doc, end = decoder.raw_decode(buf, pos)
+                # only a separator can follow an element; anything else, eg the
+                # rest of a number, means the element continues in the next chunk
+                if end < len(buf) and (buf[end].isspace() or buf[end] in ",]"):
+                    yield doc
+                    pos = end
+                    continue
+                if eof:
+                    raise ValueError(f"Bad JSON array element at character {pos}")
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+        elif eof:
+            raise ValueError(f"{getattr(fp, 'name', 'input')} ended before the JSON array was closed")
+        # read at least as much as is buffered, so an element bigger than a chunk parses in O(size)
+        chunk = fp.read(max(chunk_size, len(buf) - pos))
+        buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+
+
+def iter_json_lines(fp, loads=json.loads):
+    """The documents of JSON Lines file fp, one per non-empty line"""
+    for line in fp:
+        if line.strip():
+            yield loads(line)
+
+
+def iter_json_docs(fname):
+    """
+    The elements of a JSON array, or the documents of a JSON Lines file, in
+    fname, read incrementally. The first character tells the formats apart.
+    """
+    with open(fname, "r") as fp:
+        first = fp.read(64).lstrip()[:1]
+        fp.seek(0)
+        if first == "[":
+            yield from iter_json_array(fp)
+        else:
+            yield from iter_json_lines(fp)
+
+
+def collect(paths, outfile, jsonl=False, workers=1, backend="auto"):
+    """
+    Stream the JSON documents in paths into outfile in order. workers threads
+    read and parse ahead, so at most 2 * workers documents are in memory.
+    """
+    docs = ordered_map(partial(read_json, loads=get_loads(backend)), paths, workers)
+    with open(outfile, "w") as out:
+        if jsonl:
+            write_json_lines(docs, out)
+        else:
+            write_json_array(docs, out)
+
+
+def process_args(args):
+    workers = getattr(args, "workers", 1)
+    collect(
+        input_paths(args.instring, getattr(args, "filelist", None), getattr(args, "globs", ()), workers),
+        args.outfile,
+        jsonl=getattr(args, "jsonl", False),
+        workers=workers,
+        backend=getattr(args, "backend", "auto"),
+    )
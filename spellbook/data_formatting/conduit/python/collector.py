@@ -7,6 +7,7 @@
 
 from __future__ import print_function
 
+import os
 from itertools import zip_longest
 from uuid import uuid4
 
@@ -42,6 +43,45 @@ def make_schema_compatible(original_node, add_uuid):
     return node
 
 
+def unique_path(top_path, seen):
+    """top_path, renamed with a uuid if an earlier file already had it"""
+    if top_path in seen:
+        print("Error! Already in results: " + top_path)
+        new_path = "-".join((top_path, str(uuid4())))
+        print("Renaming duplicate to node to: " + new_path)
+    else:
+        new_path = top_path
+    seen.add(top_path)
+    return new_path
+
+
+def collect_streaming(files, chunk_size, args):
+    """
+    Write each file's nodes to the output through an open IOHandle as soon as
+    the file is loaded, so only one input file is in memory at a time
+    """
+    seen = set()
+    for fileno, group in enumerate(grouper(files, chunk_size)):
+        fname = savename(fileno, args)
+        if os.path.exists(fname):
+            os.remove(fname)
+        handle = cb.open_node_writer(fname)
+        try:
+            for path in group:
+                if not path:
+                    continue
+                try:
+                    subnode = cb.load_node(path)
+                except IOError:
+                    print("Unable to load " + path)
+                    continue
+                subnode = make_schema_compatible(subnode, args.add_uuid)
+                for top_path in subnode.child_names():
+                    handle.write(subnode.fetch(top_path), unique_path(top_path, seen))
+        finally:
+            handle.close()
+
+
 def process_args(args):
     print(WARN)
     files = args.infiles
@@ -51,8 +91,12 @@ def process_args(args):
     else:
         chunk_size = args.chunk_size
 
+    if getattr(args, "stream", False):
+        collect_streaming(files, chunk_size, args)
+        return
+
     fileno = 0
-    results = []
+    results = set()
     for group in grouper(files, chunk_size):
         result = conduit.Node()
         for path in group:
@@ -62,16 +106,7 @@ def process_args(args):
                 subnode = cb.load_node(path)
                 subnode = make_schema_compatible(subnode, args.add_uuid)
                 for top_path in subnode.child_names():
-
-                    if top_path in results:
-                        print("Error! Already in results: " + top_path)
-                        new_path = "-".join((top_path, str(uuid4())))
-                        print("Renaming duplicate to node to: " + new_path)
-                    else:
-                        new_path = top_path
-
-                    result[new_path] = subnode[top_path]
-                    results.append(top_path)
+                    result[unique_path(top_path, results)] = subnode[top_path]
             except IOError:
                 print("Unable to load " + path)
 
@@ -176,3 +176,15 @@ def load_node_handle(fname, mode="r"):
         return handle
     else:
         raise IOError("No such file: " + fname)
+
+
+def open_node_writer(fname, mode="w"):
+    """
+    Open a conduit file handle for writing, so nodes can be written to it one
+    at a time with handle.write(node, path) instead of built up in memory.
+    """
+    options = conduit.Node()
+    options["mode"] = mode
+    handle = conduit.relay.io.IOHandle()
+    handle.open(fname, options=options)
+    return handle
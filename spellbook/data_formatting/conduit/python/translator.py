@@ -7,13 +7,19 @@
 
 
 import glob
-import multiprocessing as mp
+import json
 import os
 import re
+import shutil
+import tempfile
+import time
 
 import numpy as np
 
+from spellbook.data_formatting import npz_io
 from spellbook.data_formatting.conduit.python import conduit_bundler as cb
+from spellbook.data_formatting.parallel import ordered_map
+from spellbook.data_formatting.stack_npz import Stacker
 
 
 WARN = None
@@ -24,12 +30,236 @@ except ModuleNotFoundError:
     WARN = "\nWARNING: conduit not found."
 
 
-def run(_input, output, schema):
-    if WARN is not None:
-        print(WARN)
-    protocol = cb.determine_protocol(output)
-    # Faster loader, just read metadata
+def leaf_layouts(first, paths):
+    """
+    {path: (dtype, width)} of the numeric column for each leaf, from first, the
+    node of the first sample, or None for leaves kept per row (strings, >1-D)
+    """
+    layouts = {}
+    for path in paths:
+        value = np.asarray(first[path]) if first.has_path(path) else None
+        if value is not None and value.ndim <= 1 and value.dtype.kind in "biuf":
+            layouts[path] = (value.dtype, value.reshape(-1).size)
+        else:
+            layouts[path] = None
+    return layouts
+
+
+class ColumnBuilder(object):
+    """
+    Preallocated (n_rows, width) numpy columns for the leaves with a layout,
+    filled a row at a time, in row order, optionally into the given columns (eg
+    shared memory). Other leaves (strings, >1-D arrays, or a leaf that changed
+    type or length) are kept per row and stacked at the end, like
+    make_data_array_dict did. Missing values are NaN ("" for strings), so every
+    column has one row per sample.
+    """
+
+    def __init__(self, layouts, n_rows, columns=None):
+        self.n_rows = n_rows
+        self.columns = {}
+        self.rows = {}
+        self.missing = {path: np.zeros(n_rows, dtype=bool) for path in layouts}
+        for path, layout in layouts.items():
+            if columns is not None and path in columns:
+                self.columns[path] = columns[path]
+            elif layout is not None:
+                dtype, width = layout
+                self.columns[path] = np.empty((n_rows, width), dtype=dtype)
+            else:
+                self.rows[path] = [None] * n_rows
+
+    def set(self, row, path, value):
+        column = self.columns.get(path)
+        if column is None:
+            self.rows[path][row] = np.array(value)
+            return
+        value = np.asarray(value)
+        if value.size != column.shape[1] or value.ndim > 1 or value.dtype.kind not in "biuf":
+            self.to_rows(path, row)
+            self.rows[path][row] = value.copy()
+            return
+        if value.dtype.kind == "f" and column.dtype.kind != "f":
+            column = self.columns[path] = column.astype(np.float64)
+        column[row] = value.reshape(-1)
+
+    def set_missing(self, row, path):
+        self.missing[path][row] = True
+        column = self.columns.get(path)
+        if column is None:
+            self.rows[path][row] = None
+            return
+        if column.dtype.kind != "f":
+            column = self.columns[path] = column.astype(np.float64)
+        column[row] = np.nan
+
+    def to_rows(self, path, row):
+        """
+        Stop filling path's typed column, eg at a sample of another length in
+        row. Only the rows before row are filled; the rest start out as gaps.
+        """
+        column = self.columns.pop(path)
+        filled = zip(column[:row], self.missing[path][:row])
+        self.rows[path] = [None if gap else value.copy() for value, gap in filled] + [None] * (self.n_rows - row)
+
+    def arrays(self):
+        """{path: (n_rows, width) array}, in the order of paths"""
+        arrays = {}
+        for path in self.missing:
+            if path in self.columns:
+                arrays[path] = self.columns[path]
+                continue
+            rows = self.rows[path]
+            present = [row for row in rows if row is not None]
+            if not present:
+                arrays[path] = np.full((self.n_rows, 1), np.nan)
+                continue
+            shapes = sorted(set(np.atleast_2d(row).shape[1:] for row in present))
+            if len(shapes) > 1:
+                raise ValueError(f"{path}: samples have values of different shapes {shapes}, which cannot be stacked")
+            strings = any(row.dtype.kind in "USO" for row in present)
+            gap = np.full(present[0].shape, "" if strings else np.nan)
+            arrays[path] = np.vstack([gap if row is None else row for row in rows])
+        return arrays
+
+
+def common_prefix(paths):
+    """Deepest path every one of paths is at or under"""
+    prefix = []
+    for parts in zip(*(path.split("/") for path in paths)):
+        if len(set(parts)) > 1:
+            break
+        prefix.append(parts[0])
+    return "/".join(prefix)
+
+
+def read_roots(paths, schema="auto"):
+    """
+    Subpaths of a sample to read in one IOHandle.read each, no wider than the
+    schema asks for: the subpaths listed in a comma-delimited schema, else the
+    deepest common prefix of the leaf paths under each top-level branch
+    """
+    if schema != "auto" and "," in schema:
+        listed = set(item.strip("/") for item in schema.split(","))
+        return sorted(root for root in listed if not any(root.startswith(other + "/") for other in listed))
+    branches = {}
+    for path in paths:
+        branches.setdefault(path.split("/", 1)[0], []).append(path)
+    return sorted(common_prefix(leaves) for leaves in branches.values())
+
+
+def read_sample(data_loader, sample, roots):
+    """{root: node} of the subtrees at roots in sample, one read each"""
+    nodes = {}
+    for root in roots:
+        sample_path = "/".join((sample, root))
+        if data_loader.has_path(sample_path):
+            nodes[root] = conduit.Node()
+            data_loader.read(nodes[root], sample_path)
+    return nodes
+
+
+def translate_samples(data_loader, samples, layouts, columns=None, roots=None):
+    """
+    ColumnBuilder of the leaves in layouts for samples, reading each of roots
+    (see read_roots) of a sample in one call
+    """
+    builder = ColumnBuilder(layouts, len(samples), columns)
+    if roots is None:
+        roots = read_roots(layouts)
+    split_paths = []
+    for path in layouts:
+        root = max((root for root in roots if path == root or path.startswith(root + "/")), key=len)
+        split_paths.append((path, root, path[len(root) + 1 :]))
+    for row, sample in enumerate(samples):
+        nodes = read_sample(data_loader, sample, roots)
+        for path, root, rest in split_paths:
+            node = nodes.get(root)
+            if node is None:
+                builder.set_missing(row, path)
+            elif not rest:
+                # the root itself is a leaf
+                builder.set(row, path, node.value())
+            elif node.has_path(rest):
+                builder.set(row, path, node[rest])
+            else:
+                builder.set_missing(row, path)
+    return builder
+
+
+def translate_block(task):
+    """
+    Translate one contiguous block of samples in a worker process, with its own
+    IOHandle. Numeric columns are written straight into their rows of the
+    shared .npy files; the rest come back with the gap masks.
+    """
+    _input, samples, start, layouts, shared, roots = task
+    stop = start + len(samples)
+    columns = {path: np.load(fname, mmap_mode="r+")[start:stop] for path, fname in shared.items()}
     data_loader = cb.load_node_handle(_input)
+    builder = translate_samples(data_loader, samples, layouts, columns, roots)
+    data_loader.close()
+    arrays = builder.arrays()
+    for path, column in columns.items():
+        if builder.columns.get(path) is column:
+            column.flush()
+            del arrays[path]
+    # what is left was promoted (eg int to float), ragged, or never numeric
+    return start, arrays, builder.missing
+
+
+def shared_dir(nbytes):
+    """
+    /dev/shm if it has room for nbytes, else None (the temp dir): a worker
+    writing past the end of a full /dev/shm is killed with SIGBUS
+    """
+    if not os.path.isdir("/dev/shm"):
+        return None
+    free = shutil.disk_usage("/dev/shm").free
+    if free < nbytes:
+        print(f"/dev/shm has {free} bytes free, fewer than the {nbytes} the columns need; using {tempfile.gettempdir()}")
+        return None
+    return "/dev/shm"
+
+
+def translate_parallel(_input, samples, layouts, n_processes, roots=None):
+    """
+    Split samples into one contiguous block per process and translate them in
+    parallel. The numeric columns are .npy files in shared memory (or the temp
+    dir when /dev/shm is too small) that every worker maps and fills in place.
+    A worker that dies raises BrokenProcessPool here instead of hanging.
+    """
+    n_rows = len(samples)
+    bounds = np.linspace(0, n_rows, min(n_processes, n_rows) + 1).astype(int)
+    nbytes = sum(layout[0].itemsize * layout[1] * n_rows for layout in layouts.values() if layout is not None)
+    with tempfile.TemporaryDirectory(dir=shared_dir(nbytes)) as tmp:
+        shared = {}
+        for i, (path, layout) in enumerate(layouts.items()):
+            if layout is not None:
+                dtype, width = layout
+                shared[path] = os.path.join(tmp, f"column_{i}.npy")
+                np.lib.format.open_memmap(shared[path], mode="w+", dtype=dtype, shape=(n_rows, width))
+        tasks = [(_input, samples[a:b], a, layouts, shared, roots) for a, b in zip(bounds[:-1], bounds[1:])]
+        results = list(ordered_map(translate_block, tasks, len(tasks), processes=True))
+
+        all_dict, missing = {}, {}
+        for path in layouts:
+            missing[path] = np.concatenate([gaps[path] for _, _, gaps in results])
+            if path in shared and not any(path in arrays for _, arrays, _ in results):
+                all_dict[path] = np.load(shared[path])
+                continue
+            parts = []
+            for (start, arrays, _), stop in zip(results, bounds[1:]):
+                parts.append(arrays[path] if path in arrays else np.load(shared[path], mmap_mode="r")[start:stop])
+            all_dict[path] = np.concatenate(parts)
+    return all_dict, missing
+
+
+def compile_schema(data_loader, schema):
+    """
+    The leaf paths of schema ("auto", a comma-delimited list of subpaths, or a
+    json file) and their leaf_layouts, read from the first sample in data_loader
+    """
     first_data = conduit.Node()
     data_loader.read(first_data, data_loader.list_child_names()[0])
     if schema == "auto":
@@ -51,52 +281,145 @@ def run(_input, output, schema):
     data_paths = []
     for path, _ in generate_scalar_path_pairs(schema):
         data_paths.append(path)
+    return leaf_layouts(first_data, data_paths)
+
+
+def schema_cache_name(_input):
+    """Sidecar file caching the compiled schema for _input (or its chunks)"""
+    return os.path.splitext(_input)[0] + ".schema_cache.json"
+
+
+def file_stamp(fname):
+    st = os.stat(fname)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def schema_key(schema, source):
+    """What a compiled schema depends on: the schema (and its file), and the file it read the first sample from"""
+    key = {"schema": schema, "source": os.path.abspath(source), "source_stamp": file_stamp(source)}
+    if schema != "auto" and os.path.isfile(schema):
+        key["schema_stamp"] = file_stamp(schema)
+    return key
+
+
+def load_compiled_schema(_input, schema, source):
+    """
+    leaf_layouts of schema for the samples in source, from the sidecar cache of
+    _input if it was compiled from the same schema and source, else compiled and cached
+    """
+    cache = schema_cache_name(_input)
+    key = schema_key(schema, source)
+    try:
+        with open(cache, "r") as f:
+            cached = json.load(f)
+        if cached["key"] == key:
+            return {path: None if layout is None else (np.dtype(layout[0]), layout[1]) for path, layout in cached["layouts"]}
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    data_loader = cb.load_node_handle(source)
+    layouts = compile_schema(data_loader, schema)
+    data_loader.close()
+    cached = {
+        "key": key,
+        "layouts": [[path, None if layout is None else [layout[0].str, layout[1]]] for path, layout in layouts.items()],
+    }
+    try:
+        with open(cache + ".tmp", "w") as f:
+            json.dump(cached, f, indent=1)
+        os.replace(cache + ".tmp", cache)
+    except OSError as e:
+        print(f"Could not cache the compiled schema in {cache}: {e}")
+    return layouts
+
+
+def run(_input, output, schema, codec="none", level=None, n_processes=1, layouts=None):
+    """
+    Translate the samples in _input to output. layouts, the compiled schema,
+    is loaded from (or compiled into) the sidecar cache if not given.
+    """
+    if WARN is not None:
+        print(WARN)
+    protocol = cb.determine_protocol(output)
+    if layouts is None:
+        layouts = load_compiled_schema(_input, schema, _input)
+    # Faster loader, just read metadata
+    data_loader = cb.load_node_handle(_input)
     samples = data_loader.list_child_names()
+    roots = read_roots(layouts, schema)
 
-    # Walk through all the samples and create a unified list (ie pack into a
-    # dictionary of lists)
-    all_dict = {}
-    for s in samples:
-        filtered_node = conduit.Node()
-        for path in data_paths:
-            sample_path = "/".join((s, path))
-            if data_loader.has_path(sample_path):
-                data_loader.read(filtered_node[path], sample_path)
-            else:
-                filtered_node[sample_path] = np.nan  # if a value is missing, that could be a problem
-        make_data_array_dict(all_dict, filtered_node)
+    start = time.perf_counter()
+    if n_processes > 1 and len(samples) > 1:
+        data_loader.close()
+        all_dict, missing = translate_parallel(_input, samples, layouts, n_processes, roots)
+    else:
+        builder = translate_samples(data_loader, samples, layouts, roots=roots)
+        data_loader.close()
+        all_dict, missing = builder.arrays(), builder.missing
+    seconds = time.perf_counter() - start
+    print(
+        f"Translated {len(samples)} samples from {_input} in {seconds:.2f} s "
+        f"({len(samples) / max(seconds, 1e-9):.0f} samples/s)"
+    )
+    for path, gaps in missing.items():
+        if gaps.any():
+            print(f"{path}: {int(gaps.sum())} of {len(samples)} samples missing, filled with NaN")
 
-    for dat in all_dict.keys():
-        all_dict[dat] = np.vstack(all_dict[dat])
     # Save according to output extension, either numpy or conduit-compatible
     if protocol == "npz":
-        np.savez(output, **all_dict)
+        npz_io.save_npz(output, all_dict, codec=codec, level=level)
     else:
         n = cb.pack_conduit_node_from_dict(all_dict)
         cb.dump_node(n, output)
 
 
-def translate_chunk(chunk, outputs, schema):
-    _chunk_id = re.search(r"_\d+", chunk)
-    chunk_id = _chunk_id[0]
+def translate_chunk(chunk, outputs, schema, codec="none", level=None, chunk_id=None, layouts=None):
+    if chunk_id is None:
+        chunk_id = re.search(r"_\d+", chunk)[0]
     chunk_output = f"{outputs[0]}{chunk_id}{outputs[1]}"
-    run(chunk, chunk_output, schema)
+    run(chunk, chunk_output, schema, codec=codec, level=level, layouts=layouts)
+    return chunk_output
+
+
+def translate_chunk_task(task):
+    """translate_chunk(*task), for a pool"""
+    return translate_chunk(*task)
+
+
+def find_chunks(_input):
+    """[(chunk id, path)] of the '<input>_<n>.<ext>' chunk files of _input, in numeric chunk-id order"""
+    root, ext = os.path.splitext(_input)
+    pattern = re.compile(re.escape(os.path.basename(root)) + r"(_\d+)" + re.escape(ext) + "$")
+    chunks = []
+    for path in glob.glob(f"{glob.escape(root)}_*{glob.escape(ext)}"):
+        match = pattern.match(os.path.basename(path))
+        if match:
+            chunks.append((match.group(1), path))
+    return sorted(chunks, key=lambda chunk: int(chunk[0][1:]))
 
 
-def process_args(_input, output, schema, do_chunks, n_processes):
+def process_args(_input, output, schema, do_chunks, n_processes, codec="none", level=None, merge=False):
     if do_chunks:
-        inputs = os.path.splitext(_input)
         outputs = os.path.splitext(output)
         if n_processes is None:
             n_processes = os.cpu_count()
-        pool = mp.Pool(n_processes)
-        chunks = glob.glob(f"{inputs[0]}*{inputs[1]}")
-        for chunk in chunks:
-            pool.apply_async(translate_chunk, args=(chunk, outputs, schema))
-        pool.close()
-        pool.join()
+        chunks = find_chunks(_input)
+        if not chunks:
+            root, ext = os.path.splitext(_input)
+            raise ValueError(f"No chunk files like {root}_000{ext} for {_input}")
+        if merge and cb.determine_protocol(output) != "npz":
+            raise ValueError(f"-merge writes an .npz, not {output}")
+        # compiled once, from the first chunk, for every worker
+        layouts = load_compiled_schema(_input, schema, chunks[0][1])
+        tasks = ((chunk, outputs, schema, codec, level, chunk_id, layouts) for chunk_id, chunk in chunks)
+        # results come back in chunk-id order; a failed chunk stops the run and raises here
+        chunk_outputs = list(ordered_map(translate_chunk_task, tasks, min(n_processes, len(chunks)), processes=True))
+        print(f"Translated {len(chunk_outputs)} chunks")
+        if merge:
+            Stacker(codec=codec, level=level).run(output, chunk_outputs, force=True, stream=True)
     else:
-        run(_input, output, schema)
+        # with -n, split the samples of the one input across processes instead
+        run(_input, output, schema, codec=codec, level=level, n_processes=n_processes or 1)
 
 
 def generate_scalar_path_pairs(node, path=""):
@@ -0,0 +1,335 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+""" Reading and writing npz archives with a choice of compression codec.
+
+"none" and "zlib" archives are ordinary .npz files that np.load reads. "zstd" and
+"lz4" archives are uncompressed zip files whose members are compressed .npy
+streams named <key>.npy.zst or <key>.npy.lz4; read those with load_npz.
+
+With mmap_mode, load_npz memory-maps uncompressed members (and .npy files) in
+place instead of reading them, so nothing is copied until the data is used.
+The read method selects rows and columns: mapped arrays only touch the pages of
+the rows asked for, compressed members are streamed and stop at the last row.
+"""
+
+import os
+import struct
+import zipfile
+from contextlib import contextmanager
+
+import numpy as np
+
+
+try:
+    import zstandard
+except ModuleNotFoundError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ModuleNotFoundError:
+    lz4 = None
+
+
+CODECS = ("none", "zlib", "zstd", "lz4")
+SUFFIXES = {"zstd": ".npy.zst", "lz4": ".npy.lz4"}
+
+
+def check_codec(codec):
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec {codec}! Choose one of {CODECS}")
+    if codec == "zstd" and zstandard is None:
+        raise ValueError("The zstd codec needs the zstandard package: pip install zstandard")
+    if codec == "lz4" and lz4 is None:
+        raise ValueError("The lz4 codec needs the lz4 package: pip install lz4")
+
+
+def npz_name(fname):
+    """np.savez adds .npz to names without it, so do the same"""
+    if not fname.endswith(".npz"):
+        fname = fname + ".npz"
+    return fname
+
+
+def member_key(name):
+    """The array key stored in zip member name, or None if it is not an array"""
+    for suffix in (".npy",) + tuple(SUFFIXES.values()):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return None
+
+
+def open_npz_writer(fname, codec="zlib", level=None, mode="w"):
+    check_codec(codec)
+    if codec == "zlib":
+        return zipfile.ZipFile(fname, mode=mode, compression=zipfile.ZIP_DEFLATED, compresslevel=level, allowZip64=True)
+    # zstd and lz4 compress each member themselves
+    return zipfile.ZipFile(fname, mode=mode, compression=zipfile.ZIP_STORED, allowZip64=True)
+
+
+@contextmanager
+def open_member_writer(zf, key, codec="zlib", level=None):
+    """File-like object that writes the .npy bytes of key into zf with codec"""
+    with zf.open(key + SUFFIXES.get(codec, ".npy"), "w", force_zip64=True) as fid:
+        if codec == "zstd":
+            compressor = zstandard.ZstdCompressor(level=3 if level is None else level)
+            with compressor.stream_writer(fid, closefd=False) as writer:
+                yield writer
+        elif codec == "lz4":
+            with lz4.frame.open(fid, mode="wb", compression_level=0 if level is None else level) as writer:
+                yield writer
+        else:
+            yield fid
+
+
+@contextmanager
+def open_member_reader(zf, name):
+    """File-like object reading the .npy bytes of zip member name, whatever its codec"""
+    with zf.open(name) as fid:
+        if name.endswith(SUFFIXES["zstd"]):
+            check_codec("zstd")
+            with zstandard.ZstdDecompressor().stream_reader(fid, closefd=False) as reader:
+                yield reader
+        elif name.endswith(SUFFIXES["lz4"]):
+            check_codec("lz4")
+            with lz4.frame.open(fid, mode="rb") as reader:
+                yield reader
+        else:
+            yield fid
+
+
+def read_header(fp):
+    version = np.lib.format.read_magic(fp)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
+    return shape, fortran_order, dtype
+
+
+def read_exact(fp, n_bytes):
+    chunks = []
+    while n_bytes > 0:
+        chunk = fp.read(n_bytes)
+        if not chunk:
+            raise EOFError("npz member ended early")
+        chunks.append(chunk)
+        n_bytes -= len(chunk)
+    return b"".join(chunks)
+
+
+def stream_rows(fp, shape, dtype, rows, block_rows=65536):
+    """
+    array[rows] of the C-ordered array whose data fp is positioned at, reading
+    block_rows rows at a time and stopping after the last row needed
+    """
+    n_rows, row_shape = shape[0], tuple(shape[1:])
+    row_bytes = dtype.itemsize * int(np.prod(row_shape))
+    wanted = np.arange(n_rows)[rows]
+    out = np.empty((len(wanted),) + row_shape, dtype=dtype)
+    if len(wanted) == 0:
+        return out
+    order = np.argsort(wanted, kind="stable")
+    sorted_rows = wanted[order]
+    n_read = sorted_rows[-1] + 1
+    for start in range(0, n_read, block_rows):
+        n = min(block_rows, n_read - start)
+        block = np.frombuffer(read_exact(fp, n * row_bytes), dtype=dtype).reshape((n,) + row_shape)
+        lo, hi = np.searchsorted(sorted_rows, [start, start + n])
+        out[order[lo:hi]] = block[sorted_rows[lo:hi] - start]
+    return out
+
+
+def write_header(fp, shape, dtype):
+    header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": shape}
+    try:
+        np.lib.format.write_array_header_1_0(fp, header)
+    except ValueError:
+        np.lib.format.write_array_header_2_0(fp, header)
+
+
+def member_offset(zf, name):
+    """Byte offset in the zip file of the data of member name, or None if it is compressed"""
+    info = zf.getinfo(name)
+    if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1:
+        return None
+    zf.fp.seek(info.header_offset)
+    fields = struct.unpack(zipfile.structFileHeader, zf.fp.read(zipfile.sizeFileHeader))
+    # the local header's name and extra field lengths can differ from the central directory's
+    name_length, extra_length = fields[10], fields[11]
+    return info.header_offset + zipfile.sizeFileHeader + name_length + extra_length
+
+
+class NpzReader(object):
+    """
+    Read-only, lazily loaded view of an npz archive written with any codec.
+    Behaves like the NpzFile np.load returns: .files, [key], keys(), with-block.
+    With mmap_mode ("r" or "c"), uncompressed .npy members come back as np.memmap.
+    """
+
+    def __init__(self, fname, mmap_mode=None):
+        self.fname = fname
+        self.mmap_mode = mmap_mode
+        self.zip = zipfile.ZipFile(fname)
+        self.members = {}
+        for name in self.zip.namelist():
+            key = member_key(name)
+            if key is not None:
+                self.members[key] = name
+        self.files = list(self.members)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.zip.close()
+
+    def __contains__(self, key):
+        return key in self.members
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
+
+    def keys(self):
+        return self.members.keys()
+
+    def __getitem__(self, key):
+        if self.mmap_mode is not None:
+            array = self.memmap(key)
+            if array is not None:
+                return array
+        with open_member_reader(self.zip, self.members[key]) as fp:
+            return np.lib.format.read_array(fp, allow_pickle=False)
+
+    def read(self, key, rows=None, columns=None):
+        """
+        key[rows][:, columns], where rows is a slice, boolean mask or index array,
+        reading only the rows needed. Memory-mapped only if mmap_mode is set
+        """
+        if rows is None:
+            array = self[key]
+            return array if columns is None else array[:, columns]
+        mapped = self.memmap(key)
+        if mapped is not None:
+            array = mapped[rows]
+            if columns is not None:
+                array = array[:, columns]
+            return array if self.mmap_mode is not None else np.array(array)
+        with open_member_reader(self.zip, self.members[key]) as fp:
+            shape, fortran_order, dtype = read_header(fp)
+            streamable = not (fortran_order or dtype.hasobject or len(shape) == 0)
+            if streamable:
+                array = stream_rows(fp, shape, dtype, rows)
+        if not streamable:
+            array = self[key][rows]
+        return array if columns is None else array[:, columns]
+
+    def memmap(self, key):
+        """Memory-map key in place, or None if it is compressed or can't be mapped"""
+        name = self.members[key]
+        if not name.endswith(".npy") or not isinstance(self.fname, (str, os.PathLike)):
+            return None
+        offset = member_offset(self.zip, name)
+        if offset is None:
+            return None
+        with self.zip.open(name) as fp:
+            shape, fortran_order, dtype = read_header(fp)
+            offset += fp.tell()
+        if dtype.hasobject or 0 in shape:
+            return None
+        order = "F" if fortran_order else "C"
+        return np.memmap(self.fname, dtype=dtype, mode=self.mmap_mode or "r", offset=offset, shape=shape, order=order)
+
+    def header(self, key):
+        """(shape, dtype) of key, inflating only the .npy header"""
+        with open_member_reader(self.zip, self.members[key]) as fp:
+            shape, _, dtype = read_header(fp)
+        return shape, dtype
+
+    def headers(self):
+        return {key: self.header(key) for key in self.files}
+
+
+class NpyReader(object):
+    """
+    A .npy file with the same interface as NpzReader. The fields of a structured
+    array are its keys; a plain array has the single key "arr_0".
+    """
+
+    def __init__(self, fname, mmap_mode=None):
+        self.mmap_mode = mmap_mode
+        # always mapped, so that read only copies the rows asked for
+        self.array = np.load(fname, mmap_mode=mmap_mode or "r", allow_pickle=False)
+        self.files = list(self.array.dtype.names or ["arr_0"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.array = None
+
+    def __contains__(self, key):
+        return key in self.files
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
+
+    def keys(self):
+        return list(self.files)
+
+    def __getitem__(self, key):
+        return self.read(key)
+
+    def read(self, key, rows=None, columns=None):
+        array = self.field(key)
+        if rows is not None:
+            array = array[rows]
+        if columns is not None:
+            array = array[:, columns]
+        return array if self.mmap_mode is not None else np.array(array)
+
+    def field(self, key):
+        if self.array.dtype.names is None:
+            if key != "arr_0":
+                raise KeyError(key)
+            return self.array
+        return self.array[key]
+
+    def header(self, key):
+        array = self.field(key)
+        return array.shape, array.dtype
+
+    def headers(self):
+        return {key: self.header(key) for key in self.files}
+
+
+def load_npz(fname, mmap_mode=None):
+    """NpzReader for fname, or NpyReader if it is a .npy file"""
+    if str(fname).endswith(".npy"):
+        return NpyReader(fname, mmap_mode)
+    return NpzReader(fname, mmap_mode)
+
+
+def save_npz(fname, arrays, codec="zlib", level=None):
+    """np.savez/np.savez_compressed with a choice of codec and compression level"""
+    with open_npz_writer(npz_name(fname), codec, level) as zf:
+        for key, array in arrays.items():
+            with open_member_writer(zf, key, codec, level) as fp:
+                np.lib.format.write_array(fp, np.asanyarray(array))
@@ -0,0 +1,35 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+def ordered_map(func, items, workers=1, processes=False):
+    """
+    map() over a thread pool, or a process pool if processes. Results come back
+    in the order of items, with at most 2 * workers of them submitted ahead of
+    the consumer. The first exception is raised in the consumer and the tasks
+    not yet started are cancelled.
+    """
+    if workers <= 1:
+        yield from map(func, items)
+        return
+    pool = (ProcessPoolExecutor if processes else ThreadPoolExecutor)(max_workers=workers)
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # shutdown(cancel_futures=True) needs python 3.9
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
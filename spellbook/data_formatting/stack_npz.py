@@ -6,20 +6,44 @@
 # contribute to Merlin-Spellbook.
 ##############################################################################
 
+import json
 import os
 import shutil
+from functools import partial, reduce
 
 import numpy as np
 
+from spellbook.data_formatting import npz_io
+from spellbook.data_formatting.parallel import ordered_map
+
 
 """ Merges npz files. Modified from https://jiafulow.github.io/blog/2019/02/17/merge-arrays-from-multiple-npz-files/"""
 
 
+def atleast_2d_shape(shape):
+    """The shape np.atleast_2d would give an array of this shape"""
+    return (1,) * (2 - len(shape)) + tuple(shape)
+
+
+def stacked_shape(shapes, dont_pad_first=True):
+    """
+    Final shape of stack_jagged on arrays with these shapes, without
+    touching the arrays themselves.
+    """
+    shapes = np.array([atleast_2d_shape(s) for s in shapes], dtype=np.int64)
+    if shapes.ndim != 2:
+        raise ValueError("Can not stack arrays with different numbers of dimensions")
+    dims = shapes.max(axis=0)
+    if dont_pad_first:
+        dims[0] = shapes[:, 0].sum()
+    else:
+        dims[0] = dims[0] * len(shapes)
+    return tuple(int(d) for d in dims)
+
+
 def find_max_dims(arrays):
-    dims = np.atleast_2d(arrays[0]).shape
-    for a in arrays[1:]:
-        dims = np.max((dims, np.atleast_2d(a).shape), axis=0)
-    return dims
+    shapes = np.array([atleast_2d_shape(np.shape(a)) for a in arrays])
+    return shapes.max(axis=0)
 
 
 def pad_many(arrays, dims, dont_pad_first=False, value=np.nan):
@@ -34,45 +58,190 @@ def pad_many(arrays, dims, dont_pad_first=False, value=np.nan):
     return fixed
 
 
-def stack_jagged(arrays, dont_pad_first=True, stack_func=np.vstack, **kwargs):
-    dims = find_max_dims(arrays)
-    padded = pad_many(arrays, dims, dont_pad_first, **kwargs)
-    result = stack_func(padded)
-    return result
+def stack_into(out, arrays, dont_pad_first=True, value=np.nan):
+    """
+    Write arrays one after another along the first axis of out, each into the
+    corner of its slice. Padding is written once up front, and only if needed.
+    """
+    if any(a.shape[1:] != out.shape[1:] for a in arrays) or not dont_pad_first:
+        out[...] = value
+    start = 0
+    for a in arrays:
+        out[(slice(start, start + a.shape[0]),) + tuple(slice(0, n) for n in a.shape[1:])] = a
+        start += a.shape[0] if dont_pad_first else out.shape[0] // len(arrays)
+    return out
+
+
+def stack_jagged(arrays, dont_pad_first=True, stack_func=np.vstack, value=np.nan):
+    """
+    Stack arrays of different shapes, padding them with value. For the default
+    np.vstack the result is allocated once and every array copied straight into
+    it, rather than padding each array into a temporary and copying it again.
+    """
+    if stack_func is not np.vstack:
+        dims = find_max_dims(arrays)
+        padded = pad_many(arrays, dims, dont_pad_first, value=value)
+        return stack_func(padded)
+    arrays = [np.atleast_2d(a) for a in arrays]
+    dims = stacked_shape([a.shape for a in arrays], dont_pad_first)
+    dtype = reduce(np.promote_types, set(a.dtype for a in arrays))
+    return stack_into(np.empty(dims, dtype=dtype), arrays, dont_pad_first, value)
+
+
+def read_npz_headers(path):
+    """
+    Read the shape and dtype of every array in an npz file. Only the .npy
+    header of each member is inflated, the data itself is never loaded.
+    """
+    with npz_io.load_npz(path) as data:
+        return data.headers()
+
+
+def load_npz(path):
+    with npz_io.load_npz(path) as data:
+        return {k: data[k] for k in data.files}
+
+
+def load_npz_member(path, key):
+    with npz_io.load_npz(path) as data:
+        if key not in data.files:
+            return None
+        return data[key]
+
+
+def manifest_name(target):
+    return npz_io.npz_name(target) + ".manifest.json"
+
+
+def read_manifest(target):
+    """Sources already merged into target, as absolute paths"""
+    with open(manifest_name(target), "r") as f:
+        return json.load(f)["sources"]
+
+
+def write_manifest(target, sources):
+    with open(manifest_name(target), "w") as f:
+        json.dump({"sources": [os.path.abspath(s) for s in sources]}, f, indent=1)
+
+
+def write_rows(fid, a, dims, dtype, value=np.nan):
+    """Write the rows of a to fid, padded out to the trailing dims of the output"""
+    a = np.atleast_2d(a)
+    if a.shape[1:] != dims[1:]:
+        block = stack_into(np.empty(a.shape[:1] + dims[1:], dtype=dtype), [a], value=value)
+    else:
+        block = np.ascontiguousarray(a, dtype=dtype)
+    fid.write(block)
+
+
+def copy_member_rows(reader, key, fid, dims, dtype, value=np.nan, chunk_bytes=2**26):
+    """
+    Copy the rows of key from an open npz_io.NpzReader to fid. If the padded
+    width and dtype are unchanged the bytes are copied as they are, otherwise
+    the rows are re-padded chunk_bytes at a time.
+    """
+    with npz_io.open_member_reader(reader.zip, reader.members[key]) as fp:
+        shape, fortran_order, old_dtype = npz_io.read_header(fp)
+        shape = atleast_2d_shape(shape)
+        if fortran_order:
+            write_rows(fid, reader[key], dims, dtype, value)
+        elif shape[1:] == dims[1:] and old_dtype == dtype:
+            shutil.copyfileobj(fp, fid, chunk_bytes)
+        else:
+            row_bytes = old_dtype.itemsize * int(np.prod(shape[1:]))
+            chunk_rows = max(1, chunk_bytes // max(1, row_bytes))
+            for start in range(0, shape[0], chunk_rows):
+                n_rows = min(chunk_rows, shape[0] - start)
+                a = np.frombuffer(npz_io.read_exact(fp, n_rows * row_bytes), dtype=old_dtype)
+                write_rows(fid, a.reshape((n_rows,) + shape[1:]), dims, dtype, value)
 
 
 class Stacker(object):
-    def __init__(self):
+    def __init__(self, workers=1, codec="zlib", level=None):
+        """
+        workers: number of threads loading and inflating source files. zlib
+        releases the GIL, so threads scale without copying arrays between processes.
+        codec, level: compression of the target, see npz_io.CODECS.
+        """
         self.d = {}
         self.dout = {}
+        self.workers = workers
+        npz_io.check_codec(codec)
+        self.codec = codec
+        self.level = level
 
-    def run(self, target, source, force=False):
+    def run(self, target, source, force=False, stream=False, append=False):
 
         print("Target file: {0}".format(target))
 
+        if append and os.path.isfile(npz_io.npz_name(target)):
+            self.append(npz_io.npz_name(target), source)
+            print("DONE")
+            return
+
         if not force:
             if os.path.isfile(target):
                 print("stack_npz error opening target file (does {0} exist?).".format(target))
                 print('Pass "-f" argument to force re-creation of output file.')
                 return
 
+        if not append and os.path.isfile(manifest_name(target)):
+            # a re-created target no longer matches its old manifest
+            os.remove(manifest_name(target))
+
         n_source = len(source)
         if n_source == 1:
             print("Only one source file given! Not stacking, just doing a copy.")
             shutil.copy(source[0], target)
-            print("DONE")
+        elif stream:
+            self.stack_streaming(target, source)
+        else:
+            self.stack_in_memory(target, source)
+        if append:
+            write_manifest(target, source)
+        print("DONE")
+
+    def append(self, target, source, value=np.nan):
+        """
+        Grow an existing target with the sources not yet listed in its
+        manifest. Only the new sources are opened; the rows already in the
+        target are copied across without being re-stacked, as raw bytes only
+        with the "none" codec (and an uncompressed target).
+        """
+        if not os.path.isfile(manifest_name(target)):
+            raise ValueError(f"No manifest {manifest_name(target)}: re-create {target} with --append to start one")
+        merged = read_manifest(target)
+        seen = set(merged)
+        new = []
+        for s in source:
+            if os.path.abspath(s) not in seen:
+                seen.add(os.path.abspath(s))
+                new.append(s)
+        print("stack_npz appending {0} new of {1} source files".format(len(new), len(source)))
+        if not new:
             return
+        if self.codec != "none":
+            print(
+                "stack_npz warning: with the {0} codec the rows already in {1} are decompressed and recompressed; "
+                "use --codec none for appends that only copy them".format(self.codec, target)
+            )
 
+        partial_target = target + ".partial.npz"
+        with npz_io.load_npz(target) as base:
+            self.stack_streaming(partial_target, new, value=value, base=base)
+        os.replace(partial_target, target)
+        write_manifest(target, merged + new)
+
+    def stack_in_memory(self, target, source):
         # Loop over the source files
-        for i, s in enumerate(source):
+        for i, (s, data) in enumerate(zip(source, ordered_map(load_npz, source, self.workers))):
             print("stack_npz Source file {0}: {1}".format(i, s))
-            with np.load(s) as data:
-                if i == 0:
-                    for k in data.files:
-                        self.d[k] = []
-                # Loop over all the keys
-                for k in data.files:
-                    self.d[k].append(data[k])
+            if i == 0:
+                for k in data:
+                    self.d[k] = []
+            # Loop over all the keys
+            for k in data:
+                self.d[k].append(data[k])
 
         # Merge arrays via np.hstack()
         print("stacking...")
@@ -84,10 +253,60 @@ class Stacker(object):
                 print(f"Error stacking {k}")
 
         # Write to the target file
-        np.savez_compressed(target, **self.dout)
-        print("DONE")
+        npz_io.save_npz(target, self.dout, codec=self.codec, level=self.level)
+
+    def plan_streaming(self, source, value=np.nan, base=None):
+        """
+        First pass of the streaming stack: read only the headers of every
+        source and work out the final shape and dtype of each output array.
+        base is an open npz_io.NpzReader of the target when appending.
+        """
+        headers = [] if base is None else [base.headers()]
+        for i, (s, h) in enumerate(zip(source, ordered_map(read_npz_headers, source, self.workers))):
+            print("stack_npz Source header {0}: {1}".format(i, s))
+            headers.append(h)
+
+        plan = {}
+        for k in headers[0]:
+            found = [h[k] for h in headers if k in h]
+            try:
+                shapes = [atleast_2d_shape(shape) for shape, _ in found]
+                dtype = reduce(np.promote_types, [dtype for _, dtype in found])
+                if dtype.hasobject:
+                    raise ValueError("Can not stream object arrays")
+                dims = stacked_shape(shapes)
+                if any(shape[1:] != dims[1:] for shape in shapes):
+                    # fail here rather than half way through the output, eg NaN into int
+                    np.empty(1, dtype=dtype)[:] = value
+                plan[k] = (dims, dtype)
+            except Exception:
+                print(f"Error stacking {k}")
+        if base is not None and set(plan) != set(base.files):
+            # dropping a key would lose the data already in the target
+            raise ValueError("Can not append: new sources do not stack onto " + ", ".join(set(base.files) - set(plan)))
+        return plan
+
+    def stack_streaming(self, target, source, value=np.nan, base=None):
+        """
+        Stack the sources one array at a time, copying each source array into
+        its slice of the output as it is read. Peak memory is one array from
+        one source rather than the whole ensemble. If base is given its rows
+        come first in every array.
+        """
+        plan = self.plan_streaming(source, value=value, base=base)
+
+        print("stacking...")
+        with npz_io.open_npz_writer(npz_io.npz_name(target), self.codec, self.level) as zf:
+            for k, (dims, dtype) in plan.items():
+                with npz_io.open_member_writer(zf, k, self.codec, self.level) as fid:
+                    npz_io.write_header(fid, dims, dtype)
+                    if base is not None:
+                        copy_member_rows(base, k, fid, dims, dtype, value)
+                    for a in ordered_map(partial(load_npz_member, key=k), source, self.workers):
+                        if a is not None:
+                            write_rows(fid, a, dims, dtype, value)
 
 
 def process_args(args):
-    stacker = Stacker()
-    stacker.run(args.target, args.source, force=args.force)
+    stacker = Stacker(workers=args.workers, codec=args.codec, level=args.level)
+    stacker.run(args.target, args.source, force=args.force, stream=args.stream, append=args.append)
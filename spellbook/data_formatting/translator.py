@@ -6,48 +6,299 @@
 ##############################################################################
 
 import argparse
+import itertools
 import json
+import operator
 import sys
 
 import numpy as np
 
+from spellbook.data_formatting.collector import iter_json_docs
+
 
 def setup_argparse():
     parser = argparse.ArgumentParser(description="Translate .json into numpy")
 
     parser.add_argument(
         "-input",
-        help=".json file with X and y data in each sample",
+        help=".json file with X and y data in each sample: a JSON array, or JSON Lines with one sample per line",
         default="results.json",
     )
     parser.add_argument("-output", help=".npz file with the arrays", default="results.npz")
     parser.add_argument("-schema", help="schema for a single sample data", default="features.json")
+    parser.add_argument("-batch_size", help="samples parsed and converted at a time", type=int, default=10000)
     return parser
 
 
 def process_args(args):
-    samples = json.load(open(args.input, "r"))
-    schema = json.load(open(args.schema, "r"))
-
-    input_array_dict = {}
-    output_array_dict = {}
-    for s in samples:
-        make_data_array_dict(input_array_dict, s["inputs"], schema["inputs"])
-        make_data_array_dict(output_array_dict, s["outputs"], schema["outputs"])
+    batch_size = getattr(args, "batch_size", 10000)
+    batches = batched(iter_json_docs(args.input), batch_size)
+    batch = next(batches, None)
+    if batch is None:
+        raise ValueError(f"No samples in {args.input}")
+    if args.schema == "auto":
+        schema = batch[0]
+    else:
+        with open(args.schema, "r") as f:
+            schema = json.load(f)
 
-    for path in output_array_dict:
-        output_array_dict[path] = np.array(output_array_dict[path])
+    # the columns come from the first batch, so every batch fills the same ones
+    sections = ("inputs", "outputs")
+    templates = {}
+    for section in sections:
+        templates[section] = leaf_templates([sample.get(section, {}) for sample in batch], schema[section])
+        for keys in schema_leaves(schema[section]):
+            if keys not in templates[section]:
+                path = "/".join((section,) + keys)
+                print(f"{path}: in the schema but in none of the first {len(batch)} samples, so it is left out")
+    columns = {section: {} for section in sections}
+    gaps = {section: {} for section in sections}
+    ragged = {}
+    n_samples = 0
+    while batch is not None:
+        for section in sections:
+            missing = {}
+            for path, array in translate(
+                batch, section, schema[section], templates[section], missing, ragged, n_samples
+            ).items():
+                columns[section].setdefault(path, []).append(array)
+                gaps[section].setdefault(path, []).append(missing[path])
+        n_samples += len(batch)
+        # let go of this batch before the next is parsed, so only one is in memory
+        batch = None
+        batch = next(batches, None)
 
-    for path in input_array_dict:
-        input_array_dict[path] = np.array(input_array_dict[path])
+    input_array_dict = concatenate_columns(columns["inputs"])
+    output_array_dict = concatenate_columns(columns["outputs"])
+    input_missing = concatenate_columns(gaps["inputs"])
+    output_missing = concatenate_columns(gaps["outputs"])
+    report_missing({**input_missing, **output_missing})
+    for path, n_ragged in ragged.items():
+        if n_ragged:
+            print(f"{path}: {n_ragged} of {n_samples} samples of another length, padded or truncated to the first one's")
 
     X = np.vstack([input_array_dict[x] for x in input_array_dict])
 
     output_array_dict["X"] = X.T
 
+    # row-aligned masks of the gaps, for the arrays that have any
+    if any(mask.any() for mask in input_missing.values()):
+        output_array_dict["missing/X"] = np.vstack(list(input_missing.values())).T
+    for path, mask in output_missing.items():
+        if mask.any():
+            output_array_dict["missing/" + path] = mask
+
     np.savez(args.output, **output_array_dict)
 
 
+def report_missing(missing):
+    """Print how many samples lack each path, given {path: mask of the gaps}"""
+    for path, mask in missing.items():
+        n_missing = int(mask.sum())
+        if n_missing:
+            print(f"{path}: {n_missing} of {len(mask)} samples missing ({100 * n_missing / len(mask):.1f}%)")
+
+
+def batched(items, batch_size):
+    """Lists of batch_size items, the last one shorter"""
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
+        del batch
+
+
+def concatenate_columns(columns):
+    """{path: array} from {path: [array per batch]}, freeing each path's batches once joined"""
+    arrays = {}
+    for path in list(columns):
+        parts = columns.pop(path)
+        arrays[path] = parts[0] if len(parts) == 1 else np.concatenate(parts)
+    return arrays
+
+
+def compile_schema(node, schema, path=()):
+    """
+    Key paths of the leaves of schema that node has, in node order: the paths
+    generate_scalar_path_pairs yields, found once instead of for every sample
+    """
+    paths = []
+    for child in node:
+        if child in schema:
+            if isinstance(node[child], dict):
+                if isinstance(schema[child], dict):
+                    paths.extend(compile_schema(node[child], schema[child], path + (child,)))
+            elif not isinstance(schema[child], dict):
+                paths.append(path + (child,))
+    return paths
+
+
+def schema_leaves(schema, path=()):
+    """Key paths of the leaves of schema"""
+    leaves = []
+    for child, value in schema.items():
+        if isinstance(value, dict):
+            leaves.extend(schema_leaves(value, path + (child,)))
+        else:
+            leaves.append(path + (child,))
+    return leaves
+
+
+def leaf_templates(nodes, schema):
+    """
+    {key path: template value} of the schema leaves in nodes, in the node order
+    of nodes[0], then the leaves only later nodes have. Each value, from the
+    first node with a non-null value of the leaf, sets the type and shape of
+    its column; a leaf that is null in every node gets None, a column of gaps.
+    """
+    n_leaves = len(schema_leaves(schema))
+    templates = {}
+    n_found = 0
+    for node in nodes:
+        for keys in compile_schema(node, schema):
+            if templates.get(keys) is None:
+                value = make_getter(keys)(node)
+                templates[keys] = value
+                n_found += value is not None
+        if n_found == n_leaves:
+            break
+    return templates
+
+
+def make_getter(keys):
+    """Function returning node[keys[0]][keys[1]]..."""
+    if len(keys) == 1:
+        return operator.itemgetter(keys[0])
+
+    def get(node):
+        for key in keys:
+            node = node[key]
+        return node
+
+    return get
+
+
+def fill_float_block(nodes, parent, keys):
+    """
+    (len(nodes), len(keys)) float64 array of node[parent...][key] for each key,
+    parsed straight into a preallocated buffer with one lookup per sample
+    """
+    parents = map(make_getter(parent), nodes) if parent else nodes
+    if len(keys) == 1:
+        values = map(operator.itemgetter(keys[0]), parents)
+    else:
+        values = itertools.chain.from_iterable(map(operator.itemgetter(*keys), parents))
+    block = np.fromiter(values, dtype=np.float64, count=len(nodes) * len(keys))
+    return block.reshape(len(nodes), len(keys))
+
+
+def fill_missing(get, nodes, first, path="", first_row=0):
+    """
+    Column of get(node) for every node, filled in one pass into an array
+    preallocated in the type and shape of first, the template value, the
+    boolean mask of the rows that lack it, and the number of ragged rows. Gaps
+    hold NaN (an int or bool column becomes float), or "" in string columns, so
+    rows stay aligned across columns; list values of another length are padded
+    with gaps or truncated to the length of first.
+    """
+    # null in every sample so far: a float column of gaps
+    template = np.asarray(np.nan if first is None else first)
+    strings = template.dtype.kind not in "biuf"
+    gap = "" if strings else np.nan
+    if strings:
+        column = np.full((len(nodes),) + template.shape, "", dtype=object)
+    else:
+        column = np.empty((len(nodes),) + template.shape, dtype=template.dtype)
+    missing = np.zeros(len(nodes), dtype=bool)
+    n_ragged = 0
+    for row, node in enumerate(nodes):
+        try:
+            value = get(node)
+        except (KeyError, IndexError, TypeError):
+            value = None
+        if value is None:
+            missing[row] = True
+            if column.dtype.kind in "biu":
+                column = column.astype(np.float64)
+            column[row] = gap
+            continue
+        try:
+            if template.ndim or column.dtype.kind in "biu":
+                array = np.asarray(value)
+                if array.dtype.kind == "f" and column.dtype.kind in "biu":
+                    column = column.astype(np.float64)
+                if array.shape != template.shape:
+                    if array.ndim != 1 or template.ndim != 1:
+                        raise ValueError(f"shape {array.shape}")
+                    n_ragged += 1
+                    width = min(array.size, template.size)
+                    if width < template.size and column.dtype.kind in "biu":
+                        column = column.astype(np.float64)
+                    column[row, :width] = array[:width]
+                    column[row, width:] = gap
+                    continue
+            column[row] = value
+        except (TypeError, ValueError) as e:
+            raise ValueError(
+                f"{path}: sample {first_row + row} has {value!r} ({e}), which does not fit the {column.dtype} "
+                f"column of shape {template.shape} from the first sample that has it"
+            ) from e
+    if strings:
+        column = column.astype(str)
+    return column, missing, n_ragged
+
+
+def translate(samples, section, schema, templates=None, missing=None, ragged=None, first_row=0):
+    """
+    {path: array} of the schema leaves in samples[i][section], with the columns
+    given by templates (see leaf_templates; found in samples if not given).
+    Leaves that are floats in their template are filled a parent node at a
+    time into float64 blocks; the rest go through fill_missing, which gives
+    samples lacking a leaf a gap. If missing is a dict, it gets the {path: mask}
+    of the gaps, and ragged the running count of padded or truncated rows of
+    each path. first_row, the index of samples[0] in the input, is for errors.
+    """
+    arrays = {}
+    if not samples:
+        return arrays
+    nodes = [sample.get(section, {}) for sample in samples]
+    if templates is None:
+        templates = leaf_templates(nodes, schema)
+
+    float_leaves = {}
+    for keys, value in templates.items():
+        if isinstance(value, float):
+            float_leaves.setdefault(keys[:-1], []).append(keys[-1])
+    filled = {}
+    for parent, keys in float_leaves.items():
+        try:
+            block = fill_float_block(nodes, parent, keys)
+        except (KeyError, TypeError, ValueError):
+            # gaps, strings, ragged values: leave these columns to fill_missing
+            continue
+        # NaN may be a null, which fill_missing tells apart as a gap
+        has_nan = np.isnan(block).any(axis=0)
+        for j, key in enumerate(keys):
+            if not has_nan[j]:
+                filled[parent + (key,)] = block[:, j]
+
+    no_gaps = np.zeros(len(nodes), dtype=bool)
+    for keys, value in templates.items():
+        path = "/".join(keys)
+        n_ragged = 0
+        if keys in filled:
+            arrays[path], gaps = filled[keys], no_gaps
+        else:
+            arrays[path], gaps, n_ragged = fill_missing(make_getter(keys), nodes, value, path, first_row)
+        if missing is not None:
+            missing[path] = gaps
+        if ragged is not None:
+            ragged[path] = ragged.get(path, 0) + n_ragged
+    return arrays
+
+
 def generate_scalar_path_pairs(node, schema, path=""):
     for child in node:
         # only process children that are schema compatible
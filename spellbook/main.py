@@ -5,6 +5,7 @@
 # contribute to Merlin-Spellbook.
 ##############################################################################
 
+import importlib
 import logging
 import os
 import sys
@@ -19,24 +20,28 @@ from spellbook.log_formatter import setup_logging
 LOG = logging.getLogger("spellbook")
 PLUGIN_DIR = os.path.join(os.path.dirname(__file__), "commands")
 
+# command name -> module defining its click `cli`, imported only when the command is used
+COMMANDS = {
+    "collect": "spellbook.commands.collect",
+    "conduit-collect": "spellbook.commands.conduit-collect",
+    "conduit-translate": "spellbook.commands.conduit-translate",
+    "learn": "spellbook.commands.learn",
+    "make-samples": "spellbook.commands.make-samples",
+    "predict": "spellbook.commands.predict",
+    "serialize": "spellbook.commands.serialize",
+    "stack-npz": "spellbook.commands.stack-npz",
+    "translate": "spellbook.commands.translate",
+    "tune": "spellbook.commands.tune",
+    "make-barrier-cost": "spellbook.commands.make-barrier-cost",
+}
+
 
 class SpellbookCLI(click.MultiCommand):
     def list_commands(self, ctx):
         """
         Avoids file reads for max speed.
         """
-        return [
-            "collect",
-            "conduit-collect",
-            "conduit-translate",
-            "learn",
-            "make-samples",
-            "predict",
-            "serialize",
-            "stack-npz",
-            "translate",
-            "make-barrier-cost",
-        ]
+        return list(COMMANDS)
 
     def list_commands_dynamically(self, ctx):
         rv = []
@@ -49,14 +54,16 @@ class SpellbookCLI(click.MultiCommand):
         return rv
 
     def get_command(self, ctx, name):
-        ns = {}
-        fn = os.path.join(PLUGIN_DIR, name + ".py")
-        if not os.path.isfile(fn):
-            return
-        with open(fn) as f:
-            code = compile(f.read(), fn, "exec")
-            eval(code, ns, ns)
-        return ns["cli"]
+        """
+        Imports the command module, so its bytecode is cached in __pycache__
+        instead of being compiled again on every call.
+        """
+        module = COMMANDS.get(name)
+        if module is None:
+            if not os.path.isfile(os.path.join(PLUGIN_DIR, name + ".py")):
+                return
+            module = "spellbook.commands." + name
+        return importlib.import_module(module).cli
 
 
 @click.command(cls=SpellbookCLI)
@@ -5,24 +5,64 @@
 # contribute to Merlin-Spellbook.
 ##############################################################################
 
+import ast
+import json
+import time
+
 import spellbook.ml.surrogates as surrogates
-from spellbook.utils import load_infile
+from spellbook.ml.learn_alt import FOREST_DEFAULTS
+from spellbook.ml.model_io import save_regressor
+from spellbook.utils import load_infile, parse_rows
+
+
+# the learn command used to always fit learn_alt's forest; keep its defaults unless overridden
+REGRESSOR_DEFAULTS = {"RandomForestRegressor": FOREST_DEFAULTS}
 
 
-try:
-    import cPickle as pickle
-except ImportError:
-    import pickle
+def parse_reg_args(reg_args):
+    """
+    Regressor arguments from a JSON object, eg '{"hidden_layer_sizes": [10, 10]}',
+    or comma-separated key=value pairs, eg 'n_estimators=500,max_depth=None'.
+    Values are python literals, anything else is kept as a string.
+    """
+    if reg_args is None:
+        return {}
+    if isinstance(reg_args, dict):
+        return reg_args
+    reg_args = reg_args.strip()
+    if reg_args.startswith("{"):
+        return json.loads(reg_args)
+    parsed = {}
+    for pair in reg_args.split(","):
+        if not pair.strip():
+            continue
+        if "=" not in pair:
+            raise ValueError(f"Bad regressor argument {pair}: must be key=value")
+        key, value = (part.strip() for part in pair.split("=", 1))
+        try:
+            parsed[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            parsed[key] = value
+    return parsed
 
 
 def make_regressor(args):
-    if args.reg_args is None:
-        reg_args = {}
-    else:
-        reg_args = args.reg_args
+    reg_args = parse_reg_args(args.reg_args)
 
     regr = surrogates.sklearnRegressors.factory(args.regressor, **reg_args)
-    X, y = load_infile(args.infile, X_keys=args.X, y_keys=args.y)
+    n_jobs = getattr(args, "n_jobs", None)
+    if n_jobs is not None:
+        if "n_jobs" in regr.get_params():
+            regr.set_params(n_jobs=n_jobs)
+        else:
+            print(f"{args.regressor} has no n_jobs parameter, fitting it without n_jobs={n_jobs}")
+    X, y = load_infile(
+        args.infile,
+        X_keys=args.X,
+        y_keys=args.y,
+        rows=parse_rows(getattr(args, "rows", None)),
+        subsample=getattr(args, "subsample", None),
+    )
 
     n_samples_X = X.shape[0]
     n_samples_y = y.shape[0]
@@ -36,6 +76,14 @@ def make_regressor(args):
     elif len(y.shape) == 1:
         y.reshape((-1, 1))
 
+    start = time.perf_counter()
     regr.fit(X, y)
-    with open(args.outfile, "wb") as f:
-        pickle.dump(regr, f)
+    print(f"Fit {args.regressor} to {n_samples_X} samples in {time.perf_counter() - start:.2f} s")
+    save_regressor(regr, args.outfile)
+
+
+def process_args(args):
+    reg_args = dict(REGRESSOR_DEFAULTS.get(args.regressor, {}))
+    reg_args.update(parse_reg_args(args.reg_args))
+    args.reg_args = reg_args
+    make_regressor(args)
@@ -7,15 +7,10 @@
 
 from sklearn.ensemble import RandomForestRegressor
 
+from spellbook.ml.model_io import save_regressor
 from spellbook.utils import load_infile
 
 
-try:
-    import cPickle as pickle
-except ImportError:
-    import pickle
-
-
 FOREST_DEFAULTS = {"max_depth": 2, "random_state": 0, "n_estimators": 100}
 
 
@@ -39,5 +34,4 @@ def random_forest(args):
         y.reshape((-1, 1))
 
     regr.fit(X, y)
-    with open(args.outfile, "wb") as f:
-        pickle.dump(regr, f)
+    save_regressor(regr, args.outfile)
@@ -0,0 +1,50 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+""" Saving and loading fitted regressors.
+
+The format follows the file extension. .joblib files are written with
+joblib, uncompressed, with every numpy array stored as a raw blob; loading
+memory-maps those arrays instead of copying them out of a pickle stream, so
+big models open quickly and their pages are shared between processes on a
+node. Any other extension (eg .pkl) is a plain pickle, as before.
+"""
+
+import os
+
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+
+JOBLIB_EXTENSIONS = (".joblib",)
+
+
+def is_joblib(path):
+    return os.path.splitext(path)[1].lower() in JOBLIB_EXTENSIONS
+
+
+def save_regressor(regr, path):
+    if is_joblib(path):
+        import joblib
+
+        joblib.dump(regr, path, compress=0)
+    else:
+        with open(path, "wb") as f:
+            pickle.dump(regr, f)
+
+
+def load_regressor(path, mmap_mode="r"):
+    """mmap_mode is passed to joblib.load for .joblib files; None reads the arrays into memory"""
+    if is_joblib(path):
+        import joblib
+
+        return joblib.load(path, mmap_mode=mmap_mode)
+    with open(path, "rb") as f:
+        return pickle.load(f)
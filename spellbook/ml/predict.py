@@ -5,19 +5,66 @@
 # contribute to Merlin-Spellbook.
 ##############################################################################
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
 import numpy as np
 
+from spellbook.ml import predict_server
+from spellbook.ml.model_io import load_regressor
+
+
+def predict_chunked(predict_func, X, outfile, chunk_size, workers=1):
+    """
+    Predict X chunk_size rows at a time straight into a memory-mapped .npy, so
+    neither the predictions nor (if X is memory-mapped too) the inputs have to
+    fit in memory. Blocks write to separate rows, so workers threads can share
+    the output.
+    """
+    n_rows = X.shape[0]
+    first = np.asarray(predict_func(X[:chunk_size]))
+    out = np.lib.format.open_memmap(outfile, mode="w+", dtype=first.dtype, shape=(n_rows,) + first.shape[1:])
+    out[: len(first)] = first
 
-try:
-    import cPickle as pickle
-except ImportError:
-    import pickle
+    def predict_block(start):
+        out[start : start + chunk_size] = predict_func(X[start : start + chunk_size])
+
+    starts = range(chunk_size, n_rows, chunk_size)
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(predict_block, starts))
+    else:
+        for start in starts:
+            predict_block(start)
+    out.flush()
 
 
 def predict(args):
-    regr = pickle.load(open(args.reg, "rb"))
+    chunk_size = getattr(args, "chunk_size", None)
+    workers = getattr(args, "workers", 1)
+    X = np.load(args.infile, mmap_mode="r" if chunk_size else None)
+
+    # hand off to a running predict server if there is one, it already has the model loaded
+    client = predict_server.find_server(getattr(args, "socket", None) or predict_server.default_socket())
+    if client is not None:
+        predict_func = partial(client.predict, args.reg)
+        # one connection carries one request at a time
+        workers = 1
+    else:
+        predict_func = load_regressor(args.reg).predict
+
+    try:
+        if chunk_size:
+            predict_chunked(predict_func, X, args.outfile, chunk_size, workers)
+        else:
+            np.save(open(args.outfile, "wb"), predict_func(X))
+    finally:
+        if client is not None:
+            client.close()
 
-    X = np.load(args.infile)
 
-    new_y = regr.predict(X)
-    np.save(open(args.outfile, "wb"), new_y)
+def serve(args):
+    socket_path = args.socket or predict_server.default_socket()
+    preload = [args.reg] if os.path.isfile(args.reg) else []
+    predict_server.serve(socket_path, load_regressor, preload=preload)
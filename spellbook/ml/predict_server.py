@@ -0,0 +1,211 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+""" Long-lived prediction server, so repeated predictions skip loading the model.
+
+The server listens on a Unix socket and keeps every regressor it has loaded in
+memory, reloading one only if its file changes. Each request is a regressor
+path plus an .npy array of inputs, answered with an .npy array of predictions.
+Messages are two 8-byte big-endian lengths, then a JSON header and a payload.
+
+Loading a regressor unpickles it, so only the user running the server may use
+it: the socket is created 0600, the server refuses peers of other users, and
+clients only talk to a socket (and a server) owned by their own user.
+"""
+
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+
+SIZES = struct.Struct("!QQ")
+
+
+def default_socket():
+    """Socket path shared by the server and clients of one user on one node"""
+    default = os.path.join(tempfile.gettempdir(), f"spellbook-predict-{os.getuid()}.sock")
+    return os.environ.get("SPELLBOOK_PREDICT_SOCKET", default)
+
+
+def peer_uid(sock):
+    """uid of the process at the other end of a connected Unix socket, or None where SO_PEERCRED is not supported"""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", creds)[1]
+
+
+def recv_exact(sock, n_bytes):
+    buf = bytearray(n_bytes)
+    view = memoryview(buf)
+    while view:
+        n = sock.recv_into(view)
+        if n == 0:
+            raise EOFError("connection closed")
+        view = view[n:]
+    return bytes(buf)
+
+
+def send_message(sock, header, payload=b""):
+    head = json.dumps(header).encode()
+    sock.sendall(SIZES.pack(len(head), len(payload)) + head)
+    sock.sendall(payload)
+
+
+def recv_message(sock):
+    head_size, payload_size = SIZES.unpack(recv_exact(sock, SIZES.size))
+    header = json.loads(recv_exact(sock, head_size))
+    return header, recv_exact(sock, payload_size)
+
+
+def to_npy(array):
+    f = io.BytesIO()
+    np.save(f, array, allow_pickle=False)
+    return f.getbuffer()
+
+
+def from_npy(payload):
+    return np.load(io.BytesIO(payload), allow_pickle=False)
+
+
+class ModelCache(object):
+    """Regressors by absolute path, reloaded when the file's mtime changes"""
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.models = {}
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        mtime = os.stat(path).st_mtime_ns
+        with self.lock:
+            if path not in self.models or self.models[path][0] != mtime:
+                print(f"predict server loading {path}")
+                self.models[path] = (mtime, self.loader(path))
+            return self.models[path][1]
+
+
+class PredictHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        uid = peer_uid(self.request)
+        if uid is not None and uid != os.getuid():
+            print(f"predict server refusing a connection from uid {uid}")
+            return
+        # a client may send many requests on one connection
+        while True:
+            try:
+                header, payload = recv_message(self.request)
+            except EOFError:
+                return
+            try:
+                regr = self.server.models.get(header["reg"])
+                new_y = regr.predict(from_npy(payload))
+                send_message(self.request, {"ok": True}, to_npy(new_y))
+            except Exception as e:
+                send_message(self.request, {"error": f"{type(e).__name__}: {e}"})
+
+
+class PredictServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, loader):
+        self.models = ModelCache(loader)
+        super(PredictServer, self).__init__(socket_path, PredictHandler)
+
+    def server_bind(self):
+        # created owner-only, not with the umask (eg group-writable under 002)
+        umask = os.umask(0o177)
+        try:
+            super(PredictServer, self).server_bind()
+        finally:
+            os.umask(umask)
+        os.chmod(self.server_address, 0o600)
+
+
+def serve(socket_path, loader, preload=()):
+    """Serve predictions on socket_path until interrupted or terminated"""
+    if os.path.exists(socket_path):
+        if find_server(socket_path) is not None:
+            raise ValueError(f"A predict server is already listening on {socket_path}")
+        os.remove(socket_path)  # left behind by a server that died
+    with PredictServer(socket_path, loader) as server:
+        for path in preload:
+            server.models.get(path)
+        print(f"predict server listening on {socket_path}")
+        # batch schedulers stop jobs with SIGTERM; exit through finally to remove the socket
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
+
+
+class PredictClient(object):
+    """
+    Connection to a running predict server. Keep one open to send many
+    batches, eg from an optimization loop.
+    """
+
+    def __init__(self, socket_path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.connect(socket_path)
+        except OSError:
+            self.sock.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.sock.close()
+
+    def predict(self, reg, X):
+        send_message(self.sock, {"reg": os.path.abspath(reg)}, to_npy(X))
+        header, payload = recv_message(self.sock)
+        if "error" in header:
+            raise ValueError(f"predict server error: {header['error']}")
+        return from_npy(payload)
+
+
+def find_server(socket_path):
+    """
+    A PredictClient connected to the server on socket_path, or None if there
+    is none, or if the socket or the server belongs to another user
+    """
+    if socket_path is None or not os.path.exists(socket_path):
+        return None
+    st = os.stat(socket_path)
+    if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.getuid():
+        print(f"Not using {socket_path}: it is not a socket owned by this user")
+        return None
+    try:
+        client = PredictClient(socket_path)
+    except OSError:
+        return None
+    uid = peer_uid(client.sock)
+    if uid is not None and uid != os.getuid():
+        print(f"Not using {socket_path}: the server on it runs as uid {uid}")
+        client.close()
+        return None
+    return client
@@ -7,18 +7,72 @@
 
 from __future__ import print_function
 
+import importlib
+import json
+import os
+
+import sklearn
 from sklearn import base
 
 
-try:
-    from sklearn.utils import all_estimators
-except ImportError:
-    from sklearn.utils.testing import all_estimators
+# where the regressor name -> module index is cached; set to "" to turn the cache off
+CACHE_DIR = os.environ.get("SPELLBOOK_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "spellbook"))
+
+# modules holding the usual surrogates, tried before scanning all of sklearn
+COMMON_MODULES = (
+    "sklearn.ensemble",
+    "sklearn.linear_model",
+    "sklearn.gaussian_process",
+    "sklearn.neighbors",
+    "sklearn.tree",
+    "sklearn.svm",
+    "sklearn.neural_network",
+)
+
+
+def is_regressor(class_):
+    return isinstance(class_, type) and issubclass(class_, base.RegressorMixin)
+
+
+def index_cache_name():
+    return os.path.join(CACHE_DIR, f"sklearn-{sklearn.__version__}-regressors.json")
+
+
+def read_index_cache():
+    """Cached name -> module index for the installed sklearn, or None"""
+    if not CACHE_DIR:
+        return None
+    try:
+        with open(index_cache_name(), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_index_cache(index):
+    if not CACHE_DIR:
+        return
+    fname = index_cache_name()
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # many processes may start at once, so never leave a half written file
+        tmp = f"{fname}.{os.getpid()}"
+        with open(tmp, "w") as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+        os.replace(tmp, fname)
+    except OSError:
+        pass
 
 
 class sklearnRegressors(object):
     """Scikit learn regressor factory.
 
+    Regressors are found lazily: factory() imports only the module of the
+    requested regressor, using an index cached under CACHE_DIR (keyed by the
+    sklearn version) or a guess among COMMON_MODULES. The full
+    all_estimators() scan, which imports every sklearn submodule, only runs
+    when neither finds the name, or for names().
+
     Usage:
     import surrogates
     rf1 = surrogates.sklearnRegressors.factory('RandomForestRegressor', n_estimators=5, max_depth=3)
@@ -26,7 +80,16 @@ class sklearnRegressors(object):
     choices = surrogates.sklearnRegressors.names()
     """
 
+    _all_regs = None
+    _index = None
+
+    @staticmethod
     def reg_dict():
+        try:
+            from sklearn.utils import all_estimators
+        except ImportError:
+            from sklearn.utils.testing import all_estimators
+
         _all_regressors = {}
         estimators = all_estimators()
         for name, class_ in estimators:
@@ -34,18 +97,53 @@ class sklearnRegressors(object):
                 _all_regressors[name] = class_
         return _all_regressors
 
-    all_regs = reg_dict()
+    @classmethod
+    def all_regs(cls):
+        """Every sklearn regressor by name. Slow the first time: imports all of sklearn"""
+        if cls._all_regs is None:
+            cls._all_regs = cls.reg_dict()
+            cls._index = {name: class_.__module__ for name, class_ in cls._all_regs.items()}
+            write_index_cache(cls._index)
+        return cls._all_regs
+
+    @classmethod
+    def index(cls):
+        """Regressor name -> module, without importing the regressors if it is cached"""
+        if cls._index is None:
+            cls._index = read_index_cache()
+        if cls._index is None:
+            cls.all_regs()
+        return cls._index
+
+    @classmethod
+    def get(cls, name):
+        """The regressor class called name, or None"""
+        if cls._all_regs is not None:
+            return cls._all_regs.get(name)
+        if cls._index is None:
+            cls._index = read_index_cache()
+        if cls._index is not None:
+            # the index covers every regressor of this sklearn version
+            if name not in cls._index:
+                return None
+            return getattr(importlib.import_module(cls._index[name]), name)
+        for module in COMMON_MODULES:
+            class_ = getattr(importlib.import_module(module), name, None)
+            if is_regressor(class_):
+                return class_
+        return cls.all_regs().get(name)
 
     @classmethod
     def factory(cls, name, *args, **kwargs):
-        if name in cls.all_regs:
-            return cls.all_regs[name](*args, **kwargs)
+        class_ = cls.get(name)
+        if class_ is not None:
+            return class_(*args, **kwargs)
         else:
             raise ValueError("Unknown regressor name " + name + "! For valid choices see sklearnRegressors.names()")
 
     @classmethod
     def names(cls):
-        return sorted(cls.all_regs.keys())
+        return sorted(cls.index().keys())
 
 
 def test_factory():
@@ -0,0 +1,172 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+""" Cross-validated search over regressors and their parameters.
+
+The data is loaded once and saved as .npy files that every worker process
+memory-maps read-only, so the pool shares one copy of it. With halving,
+candidates are first scored on a subsample of rows and only the best
+1/factor of them go on to the next round, with factor times more rows.
+"""
+
+import csv
+import json
+import math
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from spellbook.ml import surrogates
+from spellbook.ml.model_io import save_regressor
+from spellbook.utils import load_infile
+
+
+# filled in each worker process by init_worker
+DATA = {}
+
+
+def load_grid(grid):
+    """{regressor name: {parameter: [values]}} from a JSON string or file"""
+    if grid is None:
+        return {}
+    if os.path.isfile(grid):
+        with open(grid, "r") as f:
+            return json.load(f)
+    return json.loads(grid)
+
+
+def make_candidates(regressors, grid, n_iter=None, seed=0):
+    """(name, params) pairs: every grid point, or n_iter random ones per regressor"""
+    from sklearn.model_selection import ParameterGrid, ParameterSampler
+
+    names = list(regressors) + [name for name in grid if name not in regressors]
+    candidates = []
+    for name in names:
+        param_grid = grid.get(name, {})
+        if n_iter is None:
+            points = ParameterGrid(param_grid)
+        else:
+            points = ParameterSampler(param_grid, n_iter=min(n_iter, len(ParameterGrid(param_grid))), random_state=seed)
+        candidates.extend((name, dict(params)) for params in points)
+    return candidates
+
+
+def init_worker(X_path, y_path):
+    DATA["X"] = np.load(X_path, mmap_mode="r")
+    DATA["y"] = np.load(y_path, mmap_mode="r")
+
+
+def subsample(n_total, n_samples, seed):
+    """The same sorted random rows in every process"""
+    if n_samples >= n_total:
+        return slice(None)
+    return np.sort(np.random.default_rng(seed).permutation(n_total)[:n_samples])
+
+
+def score_candidate(task):
+    """Cross-validate one candidate on n_samples rows. Runs in a worker"""
+    from sklearn.model_selection import cross_val_score
+
+    name, params, n_samples, cv, scoring, seed = task
+    rows = subsample(len(DATA["y"]), n_samples, seed)
+    X, y = DATA["X"][rows], DATA["y"][rows]
+    result = {"regressor": name, "params": json.dumps(params, sort_keys=True), "n_samples": len(y)}
+    start = time.perf_counter()
+    try:
+        scores = cross_val_score(surrogates.sklearnRegressors.factory(name, **params), X, y, cv=cv, scoring=scoring)
+        result.update({"mean_score": float(np.mean(scores)), "std_score": float(np.std(scores)), "error": ""})
+    except Exception as e:
+        result.update({"mean_score": np.nan, "std_score": np.nan, "error": f"{type(e).__name__}: {e}"})
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def halving_rounds(n_candidates, n_total, factor, min_samples):
+    """Sample counts for each round of successive halving"""
+    n_rounds = max(1, math.ceil(math.log(max(n_candidates, 1), factor)))
+    n_samples = max(min_samples, n_total // factor ** (n_rounds - 1))
+    rounds = []
+    for _ in range(n_rounds):
+        rounds.append(min(n_samples, n_total))
+        n_samples *= factor
+    rounds[-1] = n_total
+    return rounds
+
+
+def rank(results):
+    """Best first; failed candidates last"""
+    return sorted(results, key=lambda r: -np.inf if np.isnan(r["mean_score"]) else r["mean_score"], reverse=True)
+
+
+def tune(X, y, candidates, cv=5, scoring=None, halving=False, factor=3, processes=None, seed=0):
+    """Score every candidate, returning the table of all evaluations and the best one's row"""
+    if factor < 2:
+        raise ValueError("factor must be at least 2")
+    if y.ndim == 2 and y.shape[1] == 1:
+        y = y.ravel()
+    if halving:
+        rounds = halving_rounds(len(candidates), len(y), factor, min_samples=2 * cv)
+    else:
+        rounds = [len(y)]
+
+    table = []
+    with tempfile.TemporaryDirectory() as tmp:
+        X_path, y_path = os.path.join(tmp, "X.npy"), os.path.join(tmp, "y.npy")
+        np.save(X_path, X)
+        np.save(y_path, y)
+        with mp.Pool(processes, initializer=init_worker, initargs=(X_path, y_path)) as pool:
+            for i, n_samples in enumerate(rounds):
+                print(f"tune round {i}: {len(candidates)} candidates on {min(n_samples, len(y))} samples")
+                tasks = [(name, params, n_samples, cv, scoring, seed) for name, params in candidates]
+                results = rank(pool.map(score_candidate, tasks, chunksize=1))
+                table.extend(results)
+                keep = max(1, math.ceil(len(candidates) / factor))
+                candidates = [(r["regressor"], json.loads(r["params"])) for r in results[:keep]]
+    best = results[0]
+    if np.isnan(best["mean_score"]):
+        raise ValueError("Every candidate failed, eg " + best["error"])
+    return table, best
+
+
+def write_scores(table, fname):
+    fields = ["regressor", "params", "n_samples", "mean_score", "std_score", "seconds", "error"]
+    with open(fname, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(table)
+
+
+def process_args(args):
+    X, y = load_infile(args.infile, X_keys=args.X, y_keys=args.y)
+    if X.shape[0] != y.shape[0]:
+        raise ValueError("n_samples_X != n_samples_y")
+    grid = load_grid(args.grid)
+    regressors = [r for r in args.regressors.split(",") if r] if args.regressors else []
+    if not regressors and not grid:
+        regressors = ["RandomForestRegressor"]
+    candidates = make_candidates(regressors, grid, n_iter=args.n_iter, seed=args.seed)
+
+    table, best = tune(
+        X,
+        y,
+        candidates,
+        cv=args.cv,
+        scoring=args.scoring,
+        halving=args.halving,
+        factor=args.factor,
+        processes=args.processes,
+        seed=args.seed,
+    )
+    write_scores(table, args.scores)
+    print(f"Best: {best['regressor']} {best['params']}, score {best['mean_score']:.4g}")
+
+    regr = surrogates.sklearnRegressors.factory(best["regressor"], **json.loads(best["params"]))
+    regr.fit(X, y.ravel() if y.ndim == 2 and y.shape[1] == 1 else y)
+    save_regressor(regr, args.outfile)
@@ -8,7 +8,8 @@
 
 import numpy as np
 
-from spellbook.utils import load_infile
+from spellbook.data_formatting.npz_io import load_npz
+from spellbook.utils import load_infile, parse_rows, select_rows
 
 
 """ Construct a quantity of interest (cost function) for use in optimization"""
@@ -120,7 +121,7 @@ def make_barrier_qoi(f, g_constraints, maximize=False):
     return qoi
 
 
-def parse_constraints(constraint_args, data):
+def parse_constraints(constraint_args, data, rows=None):
     """Pull the constraints from the loaded data, translating the arguments.
 
     args are in strings of form
@@ -141,7 +142,7 @@ def parse_constraints(constraint_args, data):
             raise ValueError('Bad constraint format: must be "name<value" or "name>value"')
         name, value_name = constraint.split(splitter)
         value = float(value_name)
-        constraint_data.append((data[name], value, threshold_type))
+        constraint_data.append((data[name] if rows is None else data.read(name, rows), value, threshold_type))
     return constraint_data
 
 
@@ -152,8 +153,14 @@ def process_args(args):
     objective_name = args.objective
     maximize = args.maximize_objective
     constraint_metadata = args.constraints
-    data = np.load(input_file)
-    x, f = load_infile(input_file, x_variables, objective_name)
-    constraints = parse_constraints(constraint_metadata, data)
+    rows = parse_rows(getattr(args, "rows", None))
+    subsample = getattr(args, "subsample", None)
+    with load_npz(input_file) as data:
+        if subsample is not None:
+            # the same random rows for x, f and the constraints
+            x_key = (x_variables or ("X" if "X" in data.keys() else data.files[0])).split(",")[0]
+            rows = select_rows(data.header(x_key)[0][0], rows, subsample)
+        constraints = parse_constraints(constraint_metadata, data, rows)
+    x, f = load_infile(input_file, x_variables, objective_name, rows=rows)
     qoi = make_barrier_qoi(f, constraints, maximize)
     np.savez(output_file, X=x, y=qoi)
@@ -5,71 +5,74 @@
 # contribute to Merlin-Spellbook.
 ##############################################################################
 
-import click
 import numpy as np
 
+# OptionEatAll lives with the commands so they can use it without importing numpy
+from spellbook.commands import OptionEatAll  # noqa: F401
+from spellbook.data_formatting.npz_io import load_npz
 
-def load_infile(npz_file, X_keys=None, y_keys=None):
-    with np.load(npz_file) as data:
-        if X_keys is not None:
-            X = stack_arrays(data, X_keys)  # inputs
-        elif "X" in data.keys():
-            X = data["X"]
-        else:
-            X = data[data.files[0]]
 
-        if y_keys is not None:
-            y = stack_arrays(data, y_keys)  # outputs
-        elif "y" in data.keys():
-            y = data["y"]
-        else:
-            y = data[data.files[1]]
+def load_infile(npz_file, X_keys=None, y_keys=None, mmap_mode="r", rows=None, subsample=None, seed=0):
+    """
+    X and y from an .npz (or .npy) file. Uncompressed arrays are memory-mapped
+    read-only unless mmap_mode is None, and a single key is returned without a copy.
+    rows (a slice, mask or index array) and subsample select the samples read,
+    see select_rows.
+    """
+    with load_npz(npz_file, mmap_mode=mmap_mode) as data:
+        if X_keys is None:
+            X_keys = "X" if "X" in data.keys() else data.files[0]
+        if y_keys is None:
+            y_keys = "y" if "y" in data.keys() else data.files[1]
+        if subsample is not None:
+            n_rows = data.header(X_keys.split(",")[0])[0][0]
+            rows = select_rows(n_rows, rows, subsample, seed)
+        X = stack_arrays(data, X_keys, rows=rows)  # inputs
+        y = stack_arrays(data, y_keys, rows=rows)  # outputs
     return X, y
 
 
-def stack_arrays(data, delimited_names, delimiter=","):
-    stacked = np.hstack([data[name] for name in delimited_names.split(delimiter)])
-    return stacked
+def stack_arrays(data, delimited_names, delimiter=",", rows=None):
+    """np.hstack of the named arrays, copied once into a preallocated output"""
+    names = delimited_names.split(delimiter)
+    if rows is None:
+        arrays = [np.atleast_1d(data[name]) for name in names]
+    else:
+        arrays = [np.atleast_1d(data.read(name, rows)) for name in names]
+    if len(arrays) == 1:
+        return arrays[0]
+    axis = 0 if arrays[0].ndim == 1 else 1
+    shape = list(arrays[0].shape)
+    shape[axis] = sum(array.shape[axis] for array in arrays)
+    stacked = np.empty(shape, dtype=np.result_type(*arrays))
+    return np.concatenate(arrays, axis=axis, out=stacked)
 
 
-class OptionEatAll(click.Option):
-    def __init__(self, *args, **kwargs):
-        self.save_other_options = kwargs.pop("save_other_options", True)
-        nargs = kwargs.pop("nargs", -1)
-        if nargs != -1:
-            raise ValueError("nargs, if set, must be -1, not {}")
-        super(OptionEatAll, self).__init__(*args, **kwargs)
-        self._previous_parser_process = None
-        self._eat_all_parser = None
+def parse_rows(spec):
+    """slice for a "start:stop[:step]" row range (any part may be empty), or None for None"""
+    if spec is None:
+        return None
+    parts = spec.split(":")
+    if len(parts) not in (2, 3):
+        raise ValueError(f"Bad row range {spec}: must be start:stop or start:stop:step")
+    try:
+        return slice(*(int(part) if part.strip() else None for part in parts))
+    except ValueError:
+        raise ValueError(f"Bad row range {spec}: start, stop and step must be integers")
 
-    def add_to_parser(self, parser, ctx):
-        def parser_process(value, state):
-            # method to hook to the parser.process
-            done = False
-            value = [value]
-            if self.save_other_options:
-                # grab everything up to the next option
-                while state.rargs and not done:
-                    for prefix in self._eat_all_parser.prefixes:
-                        if state.rargs[0].startswith(prefix):
-                            done = True
-                    if not done:
-                        value.append(state.rargs.pop(0))
-            else:
-                # grab everything remaining
-                value += state.rargs
-                state.rargs[:] = []
-            value = tuple(value)
 
-            # call the actual process
-            self._previous_parser_process(value, state)
-
-        retval = super(OptionEatAll, self).add_to_parser(parser, ctx)
-        for name in self.opts:
-            our_parser = parser._long_opt.get(name) or parser._short_opt.get(name)
-            if our_parser:
-                self._eat_all_parser = our_parser
-                self._previous_parser_process = our_parser.process
-                our_parser.process = parser_process
-                break
-        return retval
+def select_rows(n_rows, rows=None, subsample=None, seed=0):
+    """
+    Sorted indices of a random subsample of the n_rows samples, taken from rows
+    if given. subsample is a number of rows, or a fraction of them if below 1.
+    """
+    index = np.arange(n_rows) if rows is None else np.arange(n_rows)[rows]
+    if subsample is None:
+        return index
+    if subsample <= 0:
+        raise ValueError(f"subsample must be positive, not {subsample}")
+    n_keep = int(subsample) if subsample >= 1 else int(round(subsample * len(index)))
+    if n_keep >= len(index):
+        return index
+    keep = np.random.default_rng(seed).choice(len(index), size=n_keep, replace=False)
+    return index[np.sort(keep)]
@@ -0,0 +1,72 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from spellbook.data_formatting.conduit.python import collector
+from spellbook.data_formatting.conduit.python.collector import unique_path
+
+
+skip_conduit_tests = False
+
+try:
+    import conduit
+
+    from spellbook.data_formatting.conduit.python import conduit_bundler as cb
+except ModuleNotFoundError:
+    print("Conduit not available! These tests will be skipped!")
+    skip_conduit_tests = True
+
+
+def test_unique_path():
+    seen = set()
+    assert unique_path("sample_0", seen) == "sample_0"
+    assert unique_path("sample_1", seen) == "sample_1"
+    renamed = unique_path("sample_0", seen)
+    assert renamed.startswith("sample_0-") and len(renamed) > len("sample_0-")
+    assert seen == {"sample_0", "sample_1"}
+
+
+def make_infiles():
+    """Three small files, the last repeating sample_1 of the first"""
+    infiles = []
+    for i, names in enumerate((["sample_0", "sample_1"], ["sample_2"], ["sample_1", "sample_3"])):
+        node = conduit.Node()
+        for name in names:
+            node[name + "/inputs/x"] = float(i)
+            node[name + "/outputs/y"] = np.arange(3.0) + i
+        infiles.append(f"in_{i}.hdf5")
+        cb.dump_node(node, infiles[-1])
+    return infiles
+
+
+def collected(fname):
+    """Sorted (name, json) of the nodes in fname, with the uuid of renamed duplicates cut off"""
+    node = cb.load_node(fname)
+    return sorted((name.split("-")[0], node.fetch(name).to_json()) for name in node.child_names())
+
+
+def test_collect_stream_matches_in_memory(tmp_path, monkeypatch):
+    if skip_conduit_tests:
+        return
+    monkeypatch.chdir(tmp_path)
+    infiles = make_infiles()
+    stale = conduit.Node()
+    stale["left_over"] = 1.0
+    for chunk_size, suffixes in ((None, [""]), (2, ["_000", "_001"])):
+        for suffix in suffixes:
+            cb.dump_node(stale, f"streamed{suffix}.hdf5")
+        for stream, outfile in ((False, "memory.hdf5"), (True, "streamed.hdf5")):
+            args = SimpleNamespace(infiles=infiles, outfile=outfile, chunk_size=chunk_size, add_uuid=False, stream=stream)
+            collector.process_args(args)
+        for suffix in suffixes:
+            assert collected(f"streamed{suffix}.hdf5") == collected(f"memory{suffix}.hdf5")
+    names = cb.load_node("streamed_001.hdf5").child_names()
+    assert "sample_3" in names and any(name.startswith("sample_1-") for name in names)
+    assert len(collected("streamed.hdf5")) == 5
@@ -0,0 +1,232 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+import multiprocessing
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import numpy.testing
+import pytest
+
+from spellbook.data_formatting.conduit.python import translator
+from spellbook.data_formatting.conduit.python.translator import ColumnBuilder, find_chunks, leaf_layouts, read_roots
+
+
+class PathDict(dict):
+    """The has_path/[path] part of a conduit node that ColumnBuilder uses"""
+
+    def has_path(self, path):
+        return path in self
+
+
+class FakeNode(object):
+    """The parts of a conduit node (or, with FakeHandle, an IOHandle) the translator uses, over nested dicts"""
+
+    def __init__(self, tree=None):
+        self.tree = tree
+
+    def __getitem__(self, path):
+        node = self.tree
+        for key in path.split("/"):
+            node = node[key]
+        return node
+
+    def has_path(self, path):
+        try:
+            self[path]
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def value(self):
+        return self.tree
+
+
+class FakeHandle(FakeNode):
+    def __init__(self, tree):
+        super(FakeHandle, self).__init__(tree)
+        self.reads = []
+
+    def read(self, node, path):
+        self.reads.append(path)
+        node.tree = self[path]
+
+    def list_child_names(self):
+        return list(self.tree)
+
+    def close(self):
+        pass
+
+
+def make_bundle(n):
+    return {
+        f"sample_{i}": {
+            "inputs": {"x": float(i), "n": i},
+            "outputs": {"scalars": {"y": 2.0 * i, "z": i + 0.5}, "series": {"t": np.arange(i + 3.0)}},
+            "label": f"s{i}",
+        }
+        for i in range(n)
+    }
+
+
+def test_column_builder():
+    first = PathDict({"x": 1.5, "n": 3, "v": np.arange(3.0), "s": "hi"})
+    layouts = leaf_layouts(first, list(first))
+    assert layouts["v"] == (np.dtype("float64"), 3) and layouts["s"] is None
+    builder = ColumnBuilder(layouts, 4)
+    rows = [
+        {"x": 1.5, "n": 3, "v": np.arange(3.0), "s": "hi"},
+        {"x": 2.5, "n": 4.5, "s": "there"},
+        {"x": 3.5, "v": np.ones(3)},
+        {"x": 4.5, "n": 5, "v": np.zeros(3), "s": "!"},
+    ]
+    for row, values in enumerate(rows):
+        for path in first:
+            if path in values:
+                builder.set(row, path, values[path])
+            else:
+                builder.set_missing(row, path)
+    arrays = builder.arrays()
+    assert list(arrays) == list(first)
+    numpy.testing.assert_array_equal(arrays["x"], [[1.5], [2.5], [3.5], [4.5]])
+    numpy.testing.assert_array_equal(arrays["n"], [[3], [4.5], [np.nan], [5]])
+    numpy.testing.assert_array_equal(arrays["v"][1], [np.nan] * 3)
+    numpy.testing.assert_array_equal(arrays["s"], [["hi"], ["there"], [""], ["!"]])
+    assert arrays["v"].shape == (4, 3)
+    numpy.testing.assert_array_equal(builder.missing["n"], [False, False, True, False])
+
+
+def test_column_builder_fills_given_columns():
+    first = PathDict({"x": 1.5, "n": 3})
+    layouts = leaf_layouts(first, list(first))
+    shared = {"x": np.zeros((6, 1)), "n": np.zeros((6, 1), dtype=int)}
+    columns = {path: shared[path][2:4] for path in shared}
+    builder = ColumnBuilder(layouts, 2, columns)
+    builder.set(0, "x", 2.0)
+    builder.set(1, "x", 3.0)
+    builder.set(0, "n", 1)
+    builder.set_missing(1, "n")
+    numpy.testing.assert_array_equal(shared["x"][:, 0], [0, 0, 2, 3, 0, 0])
+    # a gap promotes the int column to a float copy of its own
+    assert builder.columns["x"] is columns["x"] and builder.columns["n"] is not columns["n"]
+    numpy.testing.assert_array_equal(builder.arrays()["n"], [[1], [np.nan]])
+
+
+def test_column_builder_gap_after_change():
+    first = PathDict({"a": 1.0, "v": np.zeros(2)})
+    for columns in (None, {"a": np.zeros((3, 1))}):
+        builder = ColumnBuilder(leaf_layouts(first, list(first)), 3, columns)
+        # the leftover row 2 must not survive as a value once "a" turns into a string
+        builder.set(0, "a", 1.0)
+        builder.set(1, "a", "x")
+        builder.set_missing(2, "a")
+        numpy.testing.assert_array_equal(builder.arrays()["a"], [["1.0"], ["x"], [""]])
+        numpy.testing.assert_array_equal(builder.missing["a"], [False, False, True])
+
+    builder = ColumnBuilder(leaf_layouts(first, list(first)), 3)
+    builder.set(0, "v", np.zeros(2))
+    builder.set(1, "v", np.zeros(3))
+    builder.set_missing(2, "v")
+    builder.set(0, "a", 1.0)
+    builder.set(1, "a", 2.0)
+    builder.set(2, "a", 3.0)
+    with pytest.raises(ValueError, match="v: samples have values of different shapes"):
+        builder.arrays()
+
+
+def test_find_chunks(tmp_path):
+    for name in ("results_features_10.hdf5", "results_features_2.hdf5", "results_features_001.hdf5"):
+        (tmp_path / name).touch()
+    for name in ("results_features.hdf5", "results_features_2.npz", "results_features_x.hdf5", "other_3.hdf5"):
+        (tmp_path / name).touch()
+    chunks = find_chunks(str(tmp_path / "results_features.hdf5"))
+    assert [chunk_id for chunk_id, _ in chunks] == ["_001", "_2", "_10"]
+    assert chunks[0][1] == str(tmp_path / "results_features_001.hdf5")
+
+
+def test_schema_cache(tmp_path, monkeypatch):
+    source = tmp_path / "results_features_000.hdf5"
+    source.write_bytes(b"data")
+    compiled = {"inputs/x": (np.dtype("float64"), 1), "outputs/curve": (np.dtype("int32"), 5), "label": None}
+    calls = []
+
+    class Handle(object):
+        def close(self):
+            pass
+
+    def compile_schema(data_loader, schema):
+        calls.append(schema)
+        return compiled
+
+    monkeypatch.setattr(translator.cb, "load_node_handle", lambda fname: Handle())
+    monkeypatch.setattr(translator, "compile_schema", compile_schema)
+    _input = str(tmp_path / "results_features.hdf5")
+    for _ in range(2):
+        assert translator.load_compiled_schema(_input, "auto", str(source)) == compiled
+    assert calls == ["auto"]
+    assert os.path.isfile(translator.schema_cache_name(_input))
+
+    # a new schema or a rewritten source recompiles
+    translator.load_compiled_schema(_input, "inputs,outputs", str(source))
+    source.write_bytes(b"new data")
+    translator.load_compiled_schema(_input, "inputs,outputs", str(source))
+    assert calls == ["auto", "inputs,outputs", "inputs,outputs"]
+
+
+def test_shared_dir(monkeypatch):
+    monkeypatch.setattr(translator.os.path, "isdir", lambda path: True)
+    monkeypatch.setattr(translator.shutil, "disk_usage", lambda path: translator.shutil._ntuple_diskusage(64, 0, 64))
+    assert translator.shared_dir(32) == "/dev/shm"
+    # too small for the columns: the temp dir instead
+    assert translator.shared_dir(65) is None
+
+
+def test_no_chunks_error(tmp_path):
+    _input = str(tmp_path / "results_features.hdf5")
+    with pytest.raises(ValueError, match="results_features_000.hdf5"):
+        translator.process_args(_input, str(tmp_path / "out.npz"), "auto", True, 1)
+
+
+def test_read_roots(monkeypatch):
+    paths = ["inputs/x", "inputs/n", "outputs/scalars/y", "outputs/scalars/z", "label"]
+    assert read_roots(paths) == ["inputs", "label", "outputs/scalars"]
+    assert read_roots(paths, "inputs,outputs/scalars,outputs/scalars/y,label") == ["inputs", "label", "outputs/scalars"]
+
+    # only the schema's subtrees of each sample are read, not all of outputs
+    monkeypatch.setattr(translator, "conduit", SimpleNamespace(Node=FakeNode), raising=False)
+    bundle = make_bundle(3)
+    handle = FakeHandle(bundle)
+    layouts = leaf_layouts(FakeNode(bundle["sample_0"]), paths)
+    arrays = translator.translate_samples(handle, list(bundle), layouts).arrays()
+    assert handle.reads == [f"sample_{i}/{root}" for i in range(3) for root in ("inputs", "label", "outputs/scalars")]
+    numpy.testing.assert_array_equal(arrays["outputs/scalars/z"][:, 0], [0.5, 1.5, 2.5])
+    numpy.testing.assert_array_equal(arrays["label"][:, 0], ["s0", "s1", "s2"])
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="workers need the fake conduit patched in")
+def test_translate_parallel(monkeypatch):
+    monkeypatch.setattr(translator, "conduit", SimpleNamespace(Node=FakeNode), raising=False)
+    bundle = make_bundle(8)
+    for sample in bundle.values():
+        sample["outputs"]["series"]["t"] = sample["outputs"]["series"]["t"][:3]
+    del bundle["sample_3"]["inputs"]["n"]  # the int column gets a gap in the second block only
+    del bundle["sample_6"]["outputs"]
+    monkeypatch.setattr(translator.cb, "load_node_handle", lambda fname: FakeHandle(bundle))
+    paths = ["inputs/x", "inputs/n", "outputs/scalars/y", "outputs/series/t", "label"]
+    layouts = leaf_layouts(FakeNode(bundle["sample_0"]), paths)
+    samples = list(bundle)
+
+    expected = translator.translate_samples(FakeHandle(bundle), samples, layouts)
+    arrays, missing = translator.translate_parallel("bundle.hdf5", samples, layouts, 3)
+    assert list(arrays) == paths
+    for path, array in expected.arrays().items():
+        assert arrays[path].dtype == array.dtype
+        numpy.testing.assert_array_equal(arrays[path], array)
+        numpy.testing.assert_array_equal(missing[path], expected.missing[path])
+    numpy.testing.assert_array_equal(arrays["inputs/n"][:, 0], [0, 1, 2, np.nan, 4, 5, 6, 7])
+    assert arrays["outputs/series/t"].shape == (8, 3)
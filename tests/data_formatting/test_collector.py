@@ -0,0 +1,141 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+import glob
+import io
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from spellbook.data_formatting import collector
+
+
+@pytest.fixture
+def sample_files(tmp_path):
+    docs = [{"inputs": {"x": i}, "outputs": {"y": [i, i * 2.5]}, "name": f"s{i}"} for i in range(5)]
+    paths = []
+    for i, doc in enumerate(docs):
+        path = tmp_path / f"sample{i}.json"
+        path.write_text(json.dumps(doc, indent=2))
+        paths.append(str(path))
+    return docs, paths
+
+
+BACKENDS = [
+    "json",
+    "auto",
+    pytest.param("orjson", marks=pytest.mark.skipif(collector.orjson is None, reason="orjson not installed")),
+    pytest.param("ujson", marks=pytest.mark.skipif(collector.ujson is None, reason="ujson not installed")),
+]
+
+
+def test_collect_json_array(tmp_path, sample_files):
+    docs, paths = sample_files
+    outfile = tmp_path / "results.json"
+    collector.process_args(SimpleNamespace(instring="\n".join(paths), outfile=str(outfile)))
+    assert outfile.read_text() == json.dumps(docs)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("workers", [1, 3])
+def test_collect_workers_and_backends(tmp_path, sample_files, backend, workers):
+    docs, paths = sample_files
+    outfile = tmp_path / "results.json"
+    collector.collect(paths, str(outfile), workers=workers, backend=backend)
+    assert outfile.read_text() == json.dumps(docs)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_nan_falls_back_to_json(tmp_path, backend):
+    path = tmp_path / "nan.json"
+    path.write_text('{"y": NaN, "z": Infinity}')
+    outfile = tmp_path / "results.json"
+    collector.collect([str(path)], str(outfile), backend=backend)
+    assert outfile.read_text() == '[{"y": NaN, "z": Infinity}]'
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        collector.get_loads("simdjson")
+
+
+def test_collect_json_lines(tmp_path, sample_files):
+    docs, paths = sample_files
+    outfile = tmp_path / "results.jsonl"
+    collector.process_args(SimpleNamespace(instring="\n".join(paths), outfile=str(outfile), jsonl=True))
+    assert [json.loads(line) for line in outfile.read_text().splitlines()] == docs
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    """A Merlin-like workspace: study/<step>/<sample>/results.json"""
+    paths = []
+    for step in ("run", "post"):
+        for sample in range(3):
+            directory = tmp_path / "study" / step / f"{sample:02d}"
+            directory.mkdir(parents=True)
+            for name in ("results.json", "other.txt", ".hidden.json"):
+                (directory / name).write_text(json.dumps({"step": step, "sample": sample}))
+            paths.append(str(directory / "results.json"))
+    (tmp_path / "study" / ".cache" / "00").mkdir(parents=True)
+    (tmp_path / "study" / ".cache" / "00" / "results.json").write_text("{}")
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    ["study/*/*/results.json", "study/**/*.json", "study/run/0[12]/*", "study/**", "study/*/01", "study/*/01/nothing"],
+)
+@pytest.mark.parametrize("workers", [1, 4])
+def test_expand_glob_matches_glob(workspace, monkeypatch, pattern, workers):
+    monkeypatch.chdir(workspace)
+    expected = sorted(p.rstrip(os.sep) for p in glob.glob(pattern, recursive=True))
+    assert collector.expand_glob(pattern, workers) == expected
+    absolute = str(workspace / pattern)
+    assert collector.expand_glob(absolute, workers) == sorted(p.rstrip(os.sep) for p in glob.glob(absolute, recursive=True))
+
+
+def test_collect_inputs(workspace, monkeypatch):
+    monkeypatch.chdir(workspace)
+    listed = workspace / "files.txt"
+    listed.write_text("study/post/00/results.json\n\nstudy/post/01/results.json\n")
+    monkeypatch.setattr("sys.stdin", io.StringIO("study/run/02/results.json\n"))
+    outfile = workspace / "results.json"
+    for filelist, n_listed in ((str(listed), 2), ("-", 1)):
+        args = SimpleNamespace(
+            instring="study/run/00/results.json",
+            filelist=filelist,
+            globs=("study/run/*/results.json",),
+            outfile=str(outfile),
+            workers=2,
+        )
+        collector.process_args(args)
+        collected = json.loads(outfile.read_text())
+        assert len(collected) == 1 + n_listed + 3
+        assert collected[0] == {"step": "run", "sample": 0}
+        assert [doc["sample"] for doc in collected[-3:]] == [0, 1, 2]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 2**20])
+def test_iter_json_array(chunk_size):
+    docs = [{"a": i, "b": [1.5, "x,]"], "c": {"d": None}} for i in range(20)] + [1, 2.5, -3e-7, "s", [], {}, True]
+    for text in (json.dumps(docs), json.dumps(docs, indent=2), json.dumps(docs, separators=(",", ":"))):
+        assert list(collector.iter_json_array(io.StringIO(text), chunk_size)) == docs
+    assert list(collector.iter_json_array(io.StringIO(" [ ] "), chunk_size)) == []
+    for bad in ("[1, 2", '{"a": 1}', "[1.2.3]", "[tru]"):
+        with pytest.raises(ValueError):
+            list(collector.iter_json_array(io.StringIO(bad), chunk_size))
+
+
+def test_iter_json_docs_reads_collect_output(tmp_path, sample_files):
+    docs, paths = sample_files
+    for jsonl in (False, True):
+        outfile = tmp_path / "results.json"
+        collector.collect(paths, str(outfile), jsonl=jsonl)
+        assert list(collector.iter_json_docs(str(outfile))) == docs
@@ -0,0 +1,102 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+import numpy as np
+import numpy.testing
+import pytest
+
+from spellbook.data_formatting import npz_io
+from spellbook.utils import load_infile
+
+
+CODECS = [
+    ("none", None),
+    ("zlib", 1),
+    pytest.param("zstd", None, marks=pytest.mark.skipif(npz_io.zstandard is None, reason="zstandard not installed")),
+    pytest.param("lz4", None, marks=pytest.mark.skipif(npz_io.lz4 is None, reason="lz4 not installed")),
+]
+
+
+@pytest.mark.parametrize("codec,level", CODECS)
+def test_save_load_round_trip(tmp_path, codec, level):
+    arrays = {"X": np.random.random((10, 3)), "y": np.arange(10), "names": np.array(["a", "bb"])}
+    fname = str(tmp_path / "data")
+    npz_io.save_npz(fname, arrays, codec=codec, level=level)
+    with npz_io.load_npz(fname + ".npz") as data:
+        assert sorted(data.files) == ["X", "names", "y"]
+        assert data.header("X") == ((10, 3), np.dtype("float64"))
+        for k, v in arrays.items():
+            numpy.testing.assert_array_equal(data[k], v)
+    X, y = load_infile(fname + ".npz")
+    numpy.testing.assert_array_equal(X, arrays["X"])
+
+
+@pytest.mark.parametrize("codec,level", CODECS[:2])
+def test_plain_codecs_are_npz(tmp_path, codec, level):
+    fname = str(tmp_path / "data.npz")
+    npz_io.save_npz(fname, {"X": np.eye(3)}, codec=codec, level=level)
+    with np.load(fname) as data:
+        numpy.testing.assert_array_equal(data["X"], np.eye(3))
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        npz_io.check_codec("snappy")
+
+
+@pytest.mark.parametrize("savez", [np.savez, np.savez_compressed])
+def test_memmap_uncompressed_members(tmp_path, savez):
+    fname = str(tmp_path / "data.npz")
+    arrays = {"X": np.random.random((6, 2)), "F": np.asfortranarray(np.random.random((3, 4))), "s": np.float32(2.5)}
+    savez(fname, **arrays)
+    with npz_io.load_npz(fname, mmap_mode="r") as data:
+        for k, v in arrays.items():
+            assert isinstance(data[k], np.memmap) == (savez is np.savez)
+            numpy.testing.assert_array_equal(data[k], v)
+
+
+def test_npy_reader(tmp_path):
+    plain = str(tmp_path / "plain.npy")
+    np.save(plain, np.arange(5))
+    with npz_io.load_npz(plain, mmap_mode="r") as data:
+        assert data.files == ["arr_0"]
+        assert isinstance(data["arr_0"], np.memmap)
+
+    records = np.zeros(4, dtype=[("X", "f8", (3,)), ("y", "f8")])
+    records["X"] = np.arange(12).reshape(4, 3)
+    records["y"] = np.arange(4)
+    fname = str(tmp_path / "records.npy")
+    np.save(fname, records)
+    X, y = load_infile(fname)
+    numpy.testing.assert_array_equal(X, records["X"])
+    numpy.testing.assert_array_equal(y, records["y"])
+
+
+ROWS = [slice(3, 70), slice(None, None, 7), np.arange(100) % 3 == 0, np.array([50, 2, 2, 99, -1])]
+
+
+@pytest.mark.parametrize("codec,level", CODECS)
+@pytest.mark.parametrize("rows", ROWS)
+def test_read_rows_and_columns(tmp_path, codec, level, rows):
+    arrays = {"X": np.random.random((100, 4)), "y": np.arange(100)}
+    fname = str(tmp_path / "data")
+    npz_io.save_npz(fname, arrays, codec=codec, level=level)
+    for mmap_mode in (None, "r"):
+        with npz_io.load_npz(fname + ".npz", mmap_mode=mmap_mode) as data:
+            numpy.testing.assert_array_equal(data.read("y", rows), arrays["y"][rows])
+            numpy.testing.assert_array_equal(data.read("X", rows, columns=[0, 2]), arrays["X"][rows][:, [0, 2]])
+
+
+def test_stream_rows_stops_early(tmp_path):
+    fname = str(tmp_path / "data.npz")
+    np.savez_compressed(fname, X=np.arange(1000.0).reshape(500, 2))
+    with npz_io.load_npz(fname) as data:
+        with npz_io.open_member_reader(data.zip, "X.npy") as fp:
+            shape, _, dtype = npz_io.read_header(fp)
+            rows = npz_io.stream_rows(fp, shape, dtype, slice(10, 20), block_rows=8)
+            assert fp.read()  # the rows after the last block were never read
+    numpy.testing.assert_array_equal(rows, np.arange(20.0, 40.0).reshape(10, 2))
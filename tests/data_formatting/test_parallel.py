@@ -0,0 +1,30 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+import time
+
+import pytest
+
+from spellbook.data_formatting.parallel import ordered_map
+
+
+def slow_square(x):
+    time.sleep(0.01 * (x % 3))
+    if x == 5:
+        raise RuntimeError("chunk 5 failed")
+    return x * x
+
+
+@pytest.mark.parametrize("processes", [False, True])
+@pytest.mark.parametrize("workers", [1, 3])
+def test_ordered_map(processes, workers):
+    assert list(ordered_map(slow_square, range(5), workers, processes)) == [0, 1, 4, 9, 16]
+    results = []
+    with pytest.raises(RuntimeError, match="chunk 5 failed"):
+        for result in ordered_map(slow_square, range(20), workers, processes):
+            results.append(result)
+    assert results == [0, 1, 4, 9, 16]
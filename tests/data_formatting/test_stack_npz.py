@@ -0,0 +1,107 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+import os
+import zipfile
+
+import numpy as np
+import numpy.testing
+import pytest
+
+from spellbook.data_formatting.stack_npz import Stacker, read_manifest, read_npz_headers, stack_jagged, stacked_shape
+
+
+def make_sources(tmp_path):
+    sources = []
+    for i, n in enumerate((3, 5, 4)):
+        fname = str(tmp_path / f"source_{i}.npz")
+        np.savez_compressed(
+            fname,
+            X=np.random.random((2, n)),
+            y=np.full(n, float(i)),
+            scalar=np.array(i, dtype=np.float32),
+        )
+        sources.append(fname)
+    return sources
+
+
+def test_read_npz_headers(tmp_path):
+    sources = make_sources(tmp_path)
+    headers = read_npz_headers(sources[1])
+    assert headers["X"] == ((2, 5), np.dtype("float64"))
+    assert headers["scalar"] == ((), np.dtype("float32"))
+
+
+def test_stacked_shape():
+    assert stacked_shape([(2, 3), (2, 5), (1, 4)]) == (5, 5)
+    assert stacked_shape([(3,), ()]) == (2, 3)
+    assert stacked_shape([(2, 3), (2, 5)], dont_pad_first=False) == (4, 5)
+
+
+@pytest.mark.parametrize("dont_pad_first", [True, False])
+def test_stack_jagged_matches_pad_and_vstack(dont_pad_first):
+    rng = np.random.default_rng(0)
+    arrays = [rng.random((rng.integers(1, 4), rng.integers(1, 6), 2)) for _ in range(20)]
+    expected = stack_jagged(arrays, dont_pad_first, stack_func=lambda padded: np.vstack(padded))
+    result = stack_jagged(arrays, dont_pad_first)
+    numpy.testing.assert_array_equal(result, expected)
+    numpy.testing.assert_array_equal(stack_jagged([1.0, np.arange(3)]), [[1.0, np.nan, np.nan], [0.0, 1.0, 2.0]])
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_stream_matches_in_memory(tmp_path, workers):
+    sources = make_sources(tmp_path)
+    in_memory = str(tmp_path / "in_memory.npz")
+    streamed = str(tmp_path / "streamed.npz")
+    Stacker().run(in_memory, sources)
+    Stacker(workers=workers).run(streamed, sources, stream=True)
+
+    with np.load(in_memory) as expected, np.load(streamed) as result:
+        assert sorted(expected.files) == sorted(result.files)
+        for k in expected.files:
+            assert expected[k].dtype == result[k].dtype
+            numpy.testing.assert_array_equal(expected[k], result[k])
+
+
+def test_workers_keep_source_order(tmp_path):
+    sources = make_sources(tmp_path)
+    target = str(tmp_path / "stacked.npz")
+    Stacker(workers=3).run(target, sources)
+    with np.load(target) as result:
+        numpy.testing.assert_array_equal(result["y"][:, 0], [0.0, 1.0, 2.0])
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_uncompressed_target(tmp_path, stream):
+    sources = make_sources(tmp_path)
+    target = str(tmp_path / "stacked.npz")
+    Stacker(codec="none").run(target, sources, stream=stream)
+    with zipfile.ZipFile(target) as zf:
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in zf.infolist())
+    with np.load(target) as result:
+        assert result["X"].shape == (6, 5)
+
+
+def test_append_only_reads_new_sources(tmp_path, capsys):
+    sources = make_sources(tmp_path)
+    wider = str(tmp_path / "wider.npz")
+    np.savez(wider, X=np.ones((2, 7)), y=np.ones(7), scalar=np.array(9, dtype=np.float32))
+    sources.append(wider)
+    expected = str(tmp_path / "expected.npz")
+    Stacker().run(expected, sources)
+
+    target = str(tmp_path / "appended.npz")
+    Stacker().run(target, sources[:2], append=True)
+    assert read_manifest(target) == [os.path.abspath(s) for s in sources[:2]]
+    os.remove(sources[0])  # already merged, so must not be opened again
+    Stacker().run(target, sources[1:], append=True)
+    assert read_manifest(target) == [os.path.abspath(s) for s in sources]
+    assert "decompressed and recompressed" in capsys.readouterr().out
+
+    with np.load(expected) as e, np.load(target) as result:
+        for k in e.files:
+            numpy.testing.assert_array_equal(result[k], e[k])
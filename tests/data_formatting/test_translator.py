@@ -0,0 +1,167 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import numpy.testing
+import pytest
+
+from spellbook.data_formatting import translator
+
+
+def make_samples(n):
+    return [
+        {
+            "inputs": {"x": i * 0.5, "n": i, "nested": {"z": float(i) ** 2, "skip": "a"}},
+            "outputs": {"y": i * 1.5, "curve": [i, i + 1.0, i + 2.0], "label": f"s{i}", "ok": i % 2 == 0},
+            "metadata": {"host": "x"},
+        }
+        for i in range(n)
+    ]
+
+
+SCHEMA = {
+    "inputs": {"x": 0, "n": 0, "nested": {"z": 0}},
+    "outputs": {"y": 0, "curve": 0, "label": 0, "ok": 0, "absent": 0},
+}
+
+
+def reference(samples, schema):
+    """The list-appending translation translator used before columns were compiled"""
+    inputs, outputs = {}, {}
+    for s in samples:
+        translator.make_data_array_dict(inputs, s["inputs"], schema["inputs"])
+        translator.make_data_array_dict(outputs, s["outputs"], schema["outputs"])
+    outputs = {k: np.array(v) for k, v in outputs.items()}
+    outputs["X"] = np.vstack([np.array(v) for v in inputs.values()]).T
+    return outputs
+
+
+@pytest.mark.parametrize("schema", [SCHEMA, "auto"])
+@pytest.mark.parametrize("jsonl", [False, True])
+@pytest.mark.parametrize("batch_size", [3, 10000])
+def test_translate_matches_reference(tmp_path, schema, jsonl, batch_size):
+    samples = make_samples(7)
+    infile = tmp_path / "results.json"
+    if jsonl:
+        infile.write_text("\n".join(json.dumps(s) for s in samples) + "\n")
+    else:
+        infile.write_text(json.dumps(samples, indent=2))
+    schema_file = tmp_path / "schema.json"
+    schema_file.write_text(json.dumps(SCHEMA))
+    outfile = tmp_path / "results.npz"
+    args = SimpleNamespace(
+        input=str(infile),
+        output=str(outfile),
+        schema=str(schema_file) if schema != "auto" else "auto",
+        batch_size=batch_size,
+    )
+    translator.process_args(args)
+
+    expected = reference(samples, SCHEMA if schema != "auto" else samples[0])
+    with np.load(outfile) as data:
+        assert sorted(data.files) == sorted(expected)
+        for key, value in expected.items():
+            assert data[key].dtype == value.dtype
+            numpy.testing.assert_array_equal(data[key], value)
+
+
+def test_translate_mixed_and_missing():
+    samples = make_samples(4)
+    samples[2]["outputs"]["y"] = 7  # an int in a float column
+    del samples[3]["outputs"]["label"]
+    del samples[1]["outputs"]["curve"]
+    missing = {}
+    arrays = translator.translate(samples, "outputs", SCHEMA["outputs"], missing=missing)
+    numpy.testing.assert_array_equal(arrays["y"], [0.0, 1.5, 7.0, 4.5])
+    numpy.testing.assert_array_equal(arrays["label"], ["s0", "s1", "s2", ""])
+    numpy.testing.assert_array_equal(arrays["curve"][1], [np.nan] * 3)
+    numpy.testing.assert_array_equal(arrays["curve"][2], [2.0, 3.0, 4.0])
+    numpy.testing.assert_array_equal(missing["label"], [False, False, False, True])
+    assert not missing["y"].any()
+
+
+def test_translate_keeps_rows_aligned(tmp_path, capsys):
+    samples = make_samples(6)
+    del samples[0]["inputs"]["n"]
+    del samples[4]["inputs"]["nested"]
+    del samples[2]["outputs"]["y"]
+    del samples[5]["outputs"]
+    schema = {"inputs": {"x": 0, "nested": {"z": 0}}, "outputs": {"y": 0, "ok": 0}}
+    infile = tmp_path / "results.json"
+    infile.write_text(json.dumps(samples))
+    schema_file = tmp_path / "schema.json"
+    schema_file.write_text(json.dumps(schema))
+    outfile = tmp_path / "results.npz"
+    # a batch of 2 puts the gaps at the start of later batches too
+    args = SimpleNamespace(input=str(infile), output=str(outfile), schema=str(schema_file), batch_size=2)
+    translator.process_args(args)
+
+    with np.load(outfile) as data:
+        numpy.testing.assert_array_equal(data["X"][:, 0], [i * 0.5 for i in range(6)])
+        numpy.testing.assert_array_equal(data["X"][:, 1], [0, 1, 4, 9, np.nan, 25])
+        numpy.testing.assert_array_equal(data["y"], [0, 1.5, np.nan, 4.5, 6, np.nan])
+        numpy.testing.assert_array_equal(data["ok"], [1, 0, 1, 0, 1, np.nan])
+        numpy.testing.assert_array_equal(data["missing/X"][:, 1], [0, 0, 0, 0, 1, 0])
+        numpy.testing.assert_array_equal(data["missing/y"], [0, 0, 1, 0, 0, 1])
+        assert "missing/ok" in data.files
+    out = capsys.readouterr().out
+    assert "nested/z: 1 of 6 samples missing (16.7%)" in out
+    assert "y: 2 of 6 samples missing (33.3%)" in out
+
+
+def test_translate_columns_beyond_first_sample(tmp_path, capsys):
+    samples = [{"inputs": {"a": 1.0}}, {"inputs": {"a": 2.0, "c": 5}}, {"inputs": {"a": 3.0, "c": 6}, "outputs": {"y": 1}}]
+    schema = {"inputs": {"a": 0, "c": 0, "never": 0}, "outputs": {"y": 0}}
+    infile = tmp_path / "results.json"
+    infile.write_text(json.dumps(samples))
+    schema_file = tmp_path / "schema.json"
+    schema_file.write_text(json.dumps(schema))
+    outfile = tmp_path / "results.npz"
+    args = SimpleNamespace(input=str(infile), output=str(outfile), schema=str(schema_file), batch_size=3)
+    translator.process_args(args)
+
+    with np.load(outfile) as data:
+        numpy.testing.assert_array_equal(data["X"], [[1, np.nan], [2, 5], [3, 6]])
+        numpy.testing.assert_array_equal(data["y"], [np.nan, np.nan, 1])
+    assert "inputs/never: in the schema but in none of the first 3 samples" in capsys.readouterr().out
+
+
+def test_translate_ragged_lists():
+    samples = [{"outputs": {"curve": curve}} for curve in ([1, 2, 3], [1, 2], [4, 5, 6, 7], [7, 8, 9])]
+    ragged = {}
+    arrays = translator.translate(samples, "outputs", {"curve": 0}, ragged=ragged)
+    numpy.testing.assert_array_equal(arrays["curve"], [[1, 2, 3], [1, 2, np.nan], [4, 5, 6], [7, 8, 9]])
+    assert ragged == {"curve": 2}
+    # a batch of whole rows keeps the dtype of the template
+    assert translator.translate(samples[-1:], "outputs", {"curve": 0})["curve"].dtype == np.int64
+
+    samples[1]["outputs"]["curve"] = [[1, 2], [3, 4]]
+    with pytest.raises(ValueError, match=r"curve: sample 11 has \[\[1, 2\], \[3, 4\]\] \(shape \(2, 2\)\)"):
+        translator.translate(samples, "outputs", {"curve": 0}, first_row=10)
+    samples[1]["outputs"]["curve"] = "bad"
+    with pytest.raises(ValueError, match="curve: sample 1 has"):
+        translator.translate(samples, "outputs", {"curve": 0})
+
+
+def test_translate_null_template():
+    samples = [
+        {"outputs": {"y": None, "n": None, "z": None}},
+        {"outputs": {"y": 2.5, "n": 2}},
+        {"outputs": {"y": 3.5, "n": 3}},
+    ]
+    missing = {}
+    arrays = translator.translate(samples, "outputs", {"y": 0, "n": 0, "z": 0}, missing=missing)
+    assert list(arrays) == ["y", "n", "z"]
+    numpy.testing.assert_array_equal(arrays["y"], [np.nan, 2.5, 3.5])
+    numpy.testing.assert_array_equal(arrays["n"], [np.nan, 2, 3])
+    # null in every sample: a column of gaps
+    numpy.testing.assert_array_equal(arrays["z"], [np.nan] * 3)
+    numpy.testing.assert_array_equal(missing["y"], [True, False, False])
+    assert missing["z"].all()
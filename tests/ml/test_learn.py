@@ -4,3 +4,57 @@
 # files for dates and other details. No copyright assignment is required to
 # contribute to Merlin-Spellbook.
 ##############################################################################
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from spellbook.ml import learn
+from spellbook.ml.model_io import load_regressor
+
+
+def test_parse_reg_args():
+    assert learn.parse_reg_args(None) == {}
+    assert learn.parse_reg_args("n_estimators=5, max_depth=None,max_features=sqrt") == {
+        "n_estimators": 5,
+        "max_depth": None,
+        "max_features": "sqrt",
+    }
+    assert learn.parse_reg_args('{"hidden_layer_sizes": [10, 10]}') == {"hidden_layer_sizes": [10, 10]}
+    with pytest.raises(ValueError):
+        learn.parse_reg_args("n_estimators")
+
+
+def test_learn_regressor_args(tmp_path):
+    infile = str(tmp_path / "data.npz")
+    X = np.random.random((40, 3))
+    np.savez(infile, X=X, y=X.sum(axis=1))
+    outfile = str(tmp_path / "reg.pkl")
+    args = SimpleNamespace(
+        infile=infile, X=None, y=None, outfile=outfile, regressor="RandomForestRegressor", reg_args="n_estimators=7", n_jobs=2
+    )
+    learn.process_args(args)
+    regr = load_regressor(outfile)
+    assert regr.n_estimators == 7
+    assert regr.max_depth == 2
+    assert regr.n_jobs == 2
+
+
+def test_learn_rows_and_subsample(tmp_path):
+    infile = str(tmp_path / "data.npz")
+    X = np.random.random((100, 3))
+    np.savez(infile, X=X, y=X.sum(axis=1))
+    outfile = str(tmp_path / "reg.pkl")
+    args = SimpleNamespace(
+        infile=infile,
+        X=None,
+        y=None,
+        outfile=outfile,
+        regressor="LinearRegression",
+        reg_args=None,
+        rows="10:90",
+        subsample=0.5,
+    )
+    learn.make_regressor(args)
+    assert load_regressor(outfile).n_features_in_ == 3
@@ -0,0 +1,27 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+import numpy as np
+import numpy.testing
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.gaussian_process import GaussianProcessRegressor
+
+from spellbook.ml.model_io import load_regressor, save_regressor
+
+
+@pytest.mark.parametrize("ext", [".pkl", ".joblib"])
+@pytest.mark.parametrize("regressor", [RandomForestRegressor(n_estimators=3), GaussianProcessRegressor(optimizer=None)])
+def test_save_load_round_trip(tmp_path, ext, regressor):
+    X = np.random.random((30, 2))
+    regr = regressor.fit(X, X.sum(axis=1))
+    fname = str(tmp_path / ("reg" + ext))
+    save_regressor(regr, fname)
+    loaded = load_regressor(fname)
+    numpy.testing.assert_allclose(loaded.predict(X), regr.predict(X))
+    if ext == ".joblib" and isinstance(regr, GaussianProcessRegressor):
+        assert isinstance(loaded.X_train_, np.memmap)
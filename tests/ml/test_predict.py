@@ -4,3 +4,95 @@
 # files for dates and other details. No copyright assignment is required to
 # contribute to Merlin-Spellbook.
 ##############################################################################
+
+import os
+import pickle
+import stat
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import numpy.testing
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from spellbook.ml import predict, predict_server
+
+
+def make_model(tmp_path):
+    X = np.random.random((20, 3))
+    regr = LinearRegression().fit(X, X @ [1.0, 2.0, 3.0])
+    reg = str(tmp_path / "reg.pkl")
+    with open(reg, "wb") as f:
+        pickle.dump(regr, f)
+    infile = str(tmp_path / "new_x.npy")
+    np.save(infile, np.random.random((5, 3)))
+    return regr, reg, infile
+
+
+def test_predict_through_server(tmp_path):
+    regr, reg, infile = make_model(tmp_path)
+    socket_path = str(tmp_path / "predict.sock")
+    server = predict_server.PredictServer(socket_path, predict.load_regressor)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        outfile = str(tmp_path / "new_y.npy")
+        predict.predict(SimpleNamespace(infile=infile, reg=reg, outfile=outfile, socket=socket_path))
+        numpy.testing.assert_allclose(np.load(outfile), regr.predict(np.load(infile)))
+        assert list(server.models.models) == [reg]
+
+        # many batches over one connection, errors come back as exceptions
+        with predict_server.PredictClient(socket_path) as client:
+            for n in (1, 7):
+                assert client.predict(reg, np.ones((n, 3))).shape == (n,)
+            with pytest.raises(ValueError):
+                client.predict(reg, np.ones((2, 4)))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_server_socket_is_private(tmp_path, monkeypatch):
+    socket_path = str(tmp_path / "predict.sock")
+    umask = os.umask(0o002)
+    try:
+        server = predict_server.PredictServer(socket_path, predict.load_regressor)
+    finally:
+        os.umask(umask)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+        client = predict_server.find_server(socket_path)
+        assert client is not None
+        client.close()
+        # a socket of another user is not handed any inputs
+        uid = os.getuid()
+        monkeypatch.setattr(predict_server.os, "getuid", lambda: uid + 1)
+        assert predict_server.find_server(socket_path) is None
+    finally:
+        server.shutdown()
+        server.server_close()
+    plain = tmp_path / "plain"
+    plain.touch()
+    assert predict_server.find_server(str(plain)) is None
+
+
+def test_predict_without_server(tmp_path):
+    regr, reg, infile = make_model(tmp_path)
+    outfile = str(tmp_path / "new_y.npy")
+    predict.predict(SimpleNamespace(infile=infile, reg=reg, outfile=outfile, socket=str(tmp_path / "none.sock")))
+    numpy.testing.assert_allclose(np.load(outfile), regr.predict(np.load(infile)))
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_chunked_predict(tmp_path, workers):
+    regr, reg, infile = make_model(tmp_path)
+    np.save(infile, np.random.random((103, 3)))
+    outfile = str(tmp_path / "new_y.npy")
+    args = SimpleNamespace(
+        infile=infile, reg=reg, outfile=outfile, socket=str(tmp_path / "none.sock"), chunk_size=10, workers=workers
+    )
+    predict.predict(args)
+    numpy.testing.assert_allclose(np.load(outfile), regr.predict(np.load(infile)))
@@ -4,3 +4,30 @@
 # files for dates and other details. No copyright assignment is required to
 # contribute to Merlin-Spellbook.
 ##############################################################################
+
+from spellbook.ml import surrogates
+from spellbook.ml.surrogates import sklearnRegressors
+
+
+def test_lazy_lookup_and_index_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(surrogates, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(sklearnRegressors, "_all_regs", None)
+    monkeypatch.setattr(sklearnRegressors, "_index", None)
+
+    # no cache yet: found among the common modules without the full scan
+    assert sklearnRegressors.get("RandomForestRegressor").__name__ == "RandomForestRegressor"
+    assert sklearnRegressors._all_regs is None
+    assert surrogates.read_index_cache() is None
+
+    names = sklearnRegressors.names()
+    assert "GaussianProcessRegressor" in names
+    assert "RandomForestClassifier" not in names
+    assert surrogates.read_index_cache() == sklearnRegressors._index
+
+    # a new process reads the cached index instead of scanning
+    monkeypatch.setattr(sklearnRegressors, "_all_regs", None)
+    monkeypatch.setattr(sklearnRegressors, "_index", None)
+    assert sklearnRegressors.names() == names
+    assert sklearnRegressors.get("KNeighborsRegressor").__name__ == "KNeighborsRegressor"
+    assert sklearnRegressors.get("NotARegressor") is None
+    assert sklearnRegressors._all_regs is None
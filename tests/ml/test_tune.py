@@ -0,0 +1,68 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+import csv
+from types import SimpleNamespace
+
+import numpy as np
+
+from spellbook.ml import tune
+from spellbook.ml.model_io import load_regressor
+
+
+def test_make_candidates():
+    grid = {"Ridge": {"alpha": [0.1, 1.0, 10.0]}}
+    candidates = tune.make_candidates(["LinearRegression"], grid)
+    assert candidates == [
+        ("LinearRegression", {}),
+        ("Ridge", {"alpha": 0.1}),
+        ("Ridge", {"alpha": 1.0}),
+        ("Ridge", {"alpha": 10.0}),
+    ]
+    sampled = tune.make_candidates([], grid, n_iter=2, seed=1)
+    assert len(sampled) == 2 and all(name == "Ridge" for name, _ in sampled)
+
+
+def test_halving_rounds():
+    assert tune.halving_rounds(27, 900, 3, 10) == [100, 300, 900]
+    assert tune.halving_rounds(9, 900, 3, 10) == [300, 900]
+    assert tune.halving_rounds(1, 900, 3, 10) == [900]
+    assert tune.halving_rounds(27, 100, 3, 40) == [40, 100, 100]
+
+
+def test_tune(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.random((120, 3))
+    y = X @ np.array([1.0, 2.0, 3.0])
+    infile = str(tmp_path / "data.npz")
+    np.savez(infile, X=X, y=y[:, None])
+    args = SimpleNamespace(
+        infile=infile,
+        X=None,
+        y=None,
+        regressors="LinearRegression,DecisionTreeRegressor",
+        grid='{"Ridge": {"alpha": [0.01, 100.0]}, "Lasso": {"alpha": ["bad"]}}',
+        n_iter=None,
+        cv=3,
+        scoring=None,
+        halving=True,
+        factor=2,
+        processes=2,
+        seed=0,
+        outfile=str(tmp_path / "best.joblib"),
+        scores=str(tmp_path / "scores.csv"),
+    )
+    tune.process_args(args)
+
+    with open(args.scores) as f:
+        table = list(csv.DictReader(f))
+    # 5 candidates on 30 rows, the best 3 on 60, the best 2 on all 120
+    assert [int(r["n_samples"]) for r in table] == [30] * 5 + [60] * 3 + [120] * 2
+    assert table[-2]["regressor"] == "LinearRegression"
+    assert any(r["error"] for r in table if r["regressor"] == "Lasso")
+    regr = load_regressor(args.outfile)
+    np.testing.assert_allclose(regr.predict(X[:5]), y[:5])
@@ -0,0 +1,59 @@
+##############################################################################
+# Copyright (c) Lawrence Livermore National Security, LLC and other
+# Merlin-Spellbook Project developers. See top-level LICENSE and COPYRIGHT
+# files for dates and other details. No copyright assignment is required to
+# contribute to Merlin-Spellbook.
+##############################################################################
+
+import numpy as np
+import numpy.testing
+import pytest
+
+from spellbook.utils import load_infile, parse_rows, select_rows
+
+
+def test_load_infile_single_key_is_mapped(tmp_path):
+    fname = str(tmp_path / "data.npz")
+    np.savez(fname, X=np.random.random((5, 2)), y=np.arange(5.0))
+    X, y = load_infile(fname, y_keys="y")
+    assert isinstance(X, np.memmap) and isinstance(y, np.memmap)
+    assert not X.flags.writeable
+    X, y = load_infile(fname, mmap_mode=None)
+    assert not isinstance(X, np.memmap)
+
+
+def test_load_infile_multiple_keys(tmp_path):
+    fname = str(tmp_path / "data.npz")
+    a, b, c = np.random.random((4, 1)), np.ones((4, 2), dtype=np.float32), np.arange(4)
+    np.savez(fname, a=a, b=b, c=c, d=np.arange(3), e=np.arange(2.0))
+    X, y = load_infile(fname, X_keys="a,b", y_keys="d,e")
+    numpy.testing.assert_array_equal(X, np.hstack([a, b]))
+    assert X.dtype == np.float64
+    numpy.testing.assert_array_equal(y, np.hstack([np.arange(3), np.arange(2.0)]))
+
+
+def test_parse_rows():
+    assert parse_rows(None) is None
+    assert parse_rows("10:20") == slice(10, 20)
+    assert parse_rows(":-5") == slice(None, -5)
+    assert parse_rows("::2") == slice(None, None, 2)
+    for bad in ("10", "a:b", "1:2:3:4"):
+        with pytest.raises(ValueError):
+            parse_rows(bad)
+
+
+def test_select_rows():
+    numpy.testing.assert_array_equal(select_rows(10, slice(2, 5)), [2, 3, 4])
+    picked = select_rows(100, slice(50, None), subsample=0.2, seed=1)
+    assert len(picked) == 10 and picked.min() >= 50 and np.all(np.diff(picked) > 0)
+    numpy.testing.assert_array_equal(picked, select_rows(100, slice(50, None), subsample=10, seed=1))
+    assert len(select_rows(5, subsample=50)) == 5
+
+
+def test_load_infile_rows(tmp_path):
+    fname = str(tmp_path / "data.npz")
+    a, b = np.random.random((20, 1)), np.random.random((20, 2))
+    np.savez_compressed(fname, a=a, b=b, y=np.arange(20))
+    X, y = load_infile(fname, X_keys="a,b", rows=slice(5, 15), subsample=4, seed=3)
+    assert X.shape == (4, 3)
+    numpy.testing.assert_array_equal(X, np.hstack([a, b])[y])